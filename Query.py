@@ -12,6 +12,9 @@ Key Features:
     - Uses AI-based keyword extraction and subreddit filtering.
     - Performs sentiment analysis and generates an emotion distribution chart.
     - Stores past query data for review.
+    - Runs analyses in worker processes, sharing identical concurrent requests.
+    - Compares several topics (e.g. a brand and its competitors) on one shared
+      set of discussions, with overlaid charts and side-by-side summaries.
 
 Example Usage:
     Run this Streamlit app and enter a topic to analyze. 
@@ -24,11 +27,45 @@ Notes:
 """
 
 import streamlit as st
-from utils.ui import load_custom_css
-from utils.analysis import input_summarize, analyze_data
-from utils.data_source import get_comments_parallel
-from utils.display import display_rose_chart
-import matplotlib.pyplot as plt
+from utils.ui import load_custom_css, sync_past_queries
+from utils.data_source import available_sources, get_data_source
+from utils.pipeline import normalize_query
+from utils.jobs import ensure_workers, submit_job, wait_for_job, stream_summary, get_job, QUEUED, FAILED
+
+MAX_TOPICS = 5
+
+
+def compare_topics(topics, params, placeholder):
+    """
+    Runs a comparison job and shows the topics side by side once it is done.
+    """
+    ensure_workers()
+    job_id, reused = submit_job({"topics": topics, **params}, kind="comparison")
+    item = {"query": " vs ".join(topics), "job_id": job_id, "status": QUEUED}
+    sync_past_queries().append(item)
+    if reused:
+        st.caption("Joined an identical comparison requested moments ago.")
+
+    with st.spinner("Analysing..."):
+        wait_for_job(job_id, on_update=lambda job: placeholder.info(job["progress"]))
+    sync_past_queries()
+    if item["status"] == FAILED:
+        raise RuntimeError(item["error"])
+
+    placeholder.empty()
+    result = get_job(job_id)["result"]
+    st.subheader("Comparison Results")
+    st.pyplot(item["rose_chart"])
+    # A reused job keeps the spelling of the session that started it
+    topics = result["topics"]
+    for column, topic, keywords in zip(st.columns(len(topics)), topics, result["keywords"]):
+        with column:
+            st.markdown(f"#### {topic}")
+            st.caption(f"Extracted keywords: {keywords}")
+            st.write(item["comparison"][topic]["summarize"])
+    with st.expander("Model usage (latency & cost per task)"):
+        st.dataframe(result["usage"])
+
 
 def query():
     st.set_page_config(page_title="Public Opinion Trend Analysis", layout="wide")
@@ -47,59 +84,90 @@ def query():
     )
 
     # Get user input
-    user_input = st.text_input("Enter the topic you want to analyze")
+    compare = st.toggle("Compare several topics")
+    if compare:
+        topics_input = st.text_area(f"Enter the topics to compare, one per line (up to {MAX_TOPICS})")
+        # Spellings that only differ in case or spacing are one topic, as they are for the job key
+        topics = {}
+        for line in topics_input.splitlines():
+            if line.strip():
+                topics.setdefault(normalize_query(line), line.strip())
+        topics = list(topics.values())
+    else:
+        user_input = st.text_input("Enter the topic you want to analyze")
     # Customize data range
     num_results = st.slider("Number of posts to fetch", min_value=3, max_value=30, value=10, step=1)
     comment_depth = st.slider("Comment depth (nested levels)", min_value=1, max_value=5, value=2, step=1)
     min_upvotes = st.slider("Minimum upvotes required", min_value=50, max_value=200, value=100, step=10)
     summarize_detailed = st.slider("Summarize details", min_value=1, max_value=10, value=2, step=1)
     use_ai_partitioning = st.toggle("Enable AI-powered subreddit filtering")
+    sources = available_sources()
+    source = "reddit"
+    if len(sources) > 1:
+        source = st.selectbox("Data source", sources, format_func=lambda name: get_data_source(name).label)
     estimated_time = (15 + num_results * 2) * (comment_depth ** 1.2) / (min_upvotes/50)**0.5
     if use_ai_partitioning:
         estimated_time += 3  # AI filtering adds processing time
+    if compare:
+        estimated_time *= max(len(topics), 1) ** 0.5  # threads and scoring requests are shared
     st.info(f"⏳ Estimated search time: ~{round(estimated_time, 1)} seconds")
 
     if st.button("Start Analysis"):
         placeholder = st.empty()
-        if not user_input.strip():
+        params = {
+            "num_results": num_results,
+            "comment_depth": comment_depth,
+            "min_upvotes": min_upvotes,
+            "use_ai_partitioning": use_ai_partitioning,
+            "summarize_detailed": summarize_detailed,
+            "source": source,
+        }
+        if compare:
+            if not 2 <= len(topics) <= MAX_TOPICS:
+                st.error(f"Please enter between 2 and {MAX_TOPICS} topics, one per line!")
+            else:
+                placeholder.info("Processing keywords...")
+                try:
+                    compare_topics(topics, params, placeholder)
+                except Exception as e:
+                    st.error(f"Fail to analyse: {e}")
+        elif not user_input.strip():
             st.error("Please enter a valid keyword!")
         else:
             placeholder.info("Processing keywords...")
-
-            # Process keywords
-            keywords = input_summarize(user_input)
-            st.write(f"Extracted keywords: {keywords}")
-
-            # Fetch relevant posts and comments from Reddit
-            placeholder.info("Fetching relevant comments from Reddit...")
             try:
-                reddit_raw_data, comments_data = get_comments_parallel(keywords, num_results, comment_depth, min_upvotes, use_ai_partitioning)
-                placeholder.success("Data retrieved successfully!")
-
-                # Perform sentiment analysis
-                with st.spinner(f"Performing sentiment analysis..."):
-                    emotion_score, word_cloud, summarize = analyze_data(comments_data, summarize_detailed)
-
-                # Display the analysis results
+                # The analysis runs in a worker process; identical requests share one job
+                ensure_workers()
+                job_id, reused = submit_job({"user_input": user_input, **params})
+                # store data (filled in when the job finishes, also if the user leaves this page)
+                item = {"query": user_input, "job_id": job_id, "status": QUEUED}
+                sync_past_queries().append(item)
+                if reused:
+                    st.caption("Joined an identical analysis requested moments ago.")
+
+                with st.spinner("Analysing..."):
+                    job = wait_for_job(
+                        job_id,
+                        on_update=lambda job: placeholder.info(job["progress"]),
+                        until=lambda job: bool(job["partial_summary"]),
+                    )
+                if job["status"] == FAILED:
+                    raise RuntimeError(job["error"])
+
+                # Display the analysis results, the summary as it is being written
                 placeholder.empty()
+                keywords_slot = st.empty()
                 st.subheader("Analysis Results")
-                st.write(summarize)
-                rose_chart = display_rose_chart(emotion_score).gcf()
-                st.pyplot(rose_chart)
-
-                # store data
-                if "past_queries" not in st.session_state:
-                    st.session_state["past_queries"] = []
-                st.session_state["past_queries"].append({
-                    "query": user_input,
-                    "word_cloud": word_cloud,
-                    "reddit_raw_data": reddit_raw_data,
-                    "comments_data": comments_data,
-                    "summarize": summarize,
-                    "rose_chart": rose_chart
-                })
+                st.write_stream(stream_summary(job_id))
+                sync_past_queries()
+                if item["status"] == FAILED:
+                    raise RuntimeError(item["error"])
+                result = get_job(job_id)["result"]
+                keywords_slot.write(f"Extracted keywords: {result['keywords']}")
+                st.pyplot(item["rose_chart"])
+                with st.expander("Model usage (latency & cost per task)"):
+                    st.dataframe(result["usage"])
             except Exception as e:
                 st.error(f"Fail to analyse: {e}")
 
-
 query()
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Fake Backends for Benchmarks
+============================
+
+This module provides local stand-ins for the PRAW and OpenAI clients, so the
+app can be driven at scale without network access, API keys or API spend.
+Each fake answers instantly plus a configurable delay that mimics the real
+service latency.
+
+Key functionalities:
+    - A fake Reddit client: subreddit listings/search, submissions and comments.
+    - A fake OpenAI client: chat completions, plain or streamed, shaped like
+      the real replies of every prompt used in `utils.analysis` (single-topic
+      and comparison prompts), including token usage.
+    - `install()`, which swaps the fakes into `utils.clients`; it is a
+      module-level function so it can be used as a worker initializer.
+
+Notes:
+    - FAKE_REDDIT_LATENCY and FAKE_OPENAI_LATENCY set the simulated latency of
+      one call, in seconds (defaults: 0.05 and 0.2).
+"""
+
+import json
+import os
+import random
+import re
+import time
+import zlib
+from functools import cached_property
+from types import SimpleNamespace
+
+REDDIT_LATENCY = float(os.environ.get("FAKE_REDDIT_LATENCY", 0.05))
+OPENAI_LATENCY = float(os.environ.get("FAKE_OPENAI_LATENCY", 0.2))
+COMMENTS_PER_POST = 20
+WORDS = ("battery", "price", "camera", "update", "service", "design", "support", "quality", "delay", "launch")
+
+
+class FakeComment:
+    def __init__(self, rng):
+        self.body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+        self.score = rng.randint(0, 500)
+
+
+class FakeCommentForest(list):
+    def replace_more(self, limit=32):
+        time.sleep(REDDIT_LATENCY * limit)
+        return []
+
+
+class FakeSubmission:
+    def __init__(self, submission_id):
+        rng = random.Random(submission_id)
+        self.id = submission_id
+        self.title = f"Discussion {submission_id}: " + " ".join(rng.choice(WORDS) for _ in range(6))
+        self.selftext = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 80)))
+        self.score = rng.randint(10, 5000)
+        self.num_comments = COMMENTS_PER_POST
+        self.permalink = f"/r/fake/comments/{submission_id}/discussion/"
+        self.url = f"https://www.reddit.com{self.permalink}"
+        self.created_utc = time.time() - rng.randint(0, 60) * 86400
+        self._rng = rng
+
+    @cached_property
+    def comments(self):
+        return FakeCommentForest(FakeComment(self._rng) for _ in range(COMMENTS_PER_POST))
+
+
+class FakeSubreddit:
+    def __init__(self, name):
+        self.name = name
+
+    def _listing(self, seed, limit):
+        for page_start in range(0, limit or 1000, 100):
+            time.sleep(REDDIT_LATENCY)
+            for i in range(page_start, min(page_start + 100, limit or 1000)):
+                yield FakeSubmission(f"{zlib.crc32(f'{self.name}/{seed}'.encode()):x}{i:03x}")
+
+    def search(self, query, sort="relevance", time_filter="all", limit=100, **kwargs):
+        return self._listing(query, limit)
+
+    def hot(self, limit=100, **kwargs):
+        return self._listing("hot", limit)
+
+    def new(self, limit=100, **kwargs):
+        return self._listing("new", limit)
+
+    def top(self, time_filter="all", limit=100, **kwargs):
+        return self._listing("top", limit)
+
+
+class FakeReddit:
+    def subreddit(self, name):
+        return FakeSubreddit(name)
+
+    def submission(self, id=None, url=None):
+        time.sleep(REDDIT_LATENCY)
+        return FakeSubmission(id or url.rstrip("/").split("/comments/")[1].split("/")[0])
+
+
+class FakeCompletions:
+    def create(self, model, messages, stream=False, **kwargs):
+        time.sleep(OPENAI_LATENCY)
+        system = messages[0]["content"]
+        prompt = messages[-1]["content"]
+        rng = random.Random(prompt)
+        if "several topics" in system:
+            topics = json.loads(re.search(r"topics: (\[.*?\])", prompt, re.IGNORECASE).group(1))
+            if "analyzes emotions" in system:
+                reply = json.dumps({
+                    "scores": {topic: self._emotions(rng) if rng.random() < 0.7 else None for topic in topics},
+                    "confidence": round(rng.uniform(0.3, 1.0), 2),
+                })
+            else:
+                reply = json.dumps([" ".join(topic.split()[:3]) for topic in topics])
+        elif "analyzes emotions" in system:
+            reply = json.dumps({**self._emotions(rng), "confidence": round(rng.uniform(0.3, 1.0), 2)})
+            reply = f"```json\n{reply}\n```"
+        elif "search keywords" in system:
+            reply = " ".join(prompt.split("'")[1].split()[:3])
+        elif "subreddit is the most suitable" in system:
+            reply = "technology"
+        else:
+            reply = " ".join(rng.choice(WORDS) for _ in range(120))
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(reply) // 4)
+        if stream:
+            return self._stream(reply, usage)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage=usage)
+
+    @staticmethod
+    def _emotions(rng):
+        scores = [rng.random() for _ in range(6)]
+        scores = [round(100 * value / sum(scores)) for value in scores]
+        return {
+            **dict(zip(("joy", "sadness", "anger", "fear", "surprise", "disgust"), scores)),
+            "key words": rng.sample(WORDS, 3),
+        }
+
+    def _stream(self, reply, usage):
+        # One chunk per word, spread over the same latency as a whole reply
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(OPENAI_LATENCY / len(words))
+            delta = SimpleNamespace(content=word if i == 0 else " " + word)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=FakeCompletions())
+
+
+def install():
+    """
+    Replaces the shared Reddit and OpenAI clients of this process with fakes.
+    """
+    from utils import clients
+
+    clients._reddit_client = FakeReddit()
+    clients._openai_client = FakeOpenAI()
@@ -0,0 +1,207 @@
+"""
+Load Test - Concurrent Dashboard Sessions
+=========================================
+
+This script simulates many users of the dashboard at once, to size
+deployments and to catch memory that sessions leave behind. Each simulated
+session runs the Query page with a topic, then opens the History Summary,
+Word Cloud and Data Resource pages and clicks its query, using Streamlit's
+AppTest. Reddit and OpenAI are replaced by the local fakes of
+`benchmarks/fakes.py`, in this process and in the analysis workers.
+
+Key functionalities:
+    - Running concurrent simulated sessions, one driver process per concurrent
+      session, all sharing one job queue and worker pool.
+    - Script-run latency percentiles per page.
+    - Python memory growth per session (tracemalloc), so a leak shows up as
+      memory that keeps growing after its sessions are gone.
+    - Thread counts of the driver (web) processes.
+
+Example Usage:
+    python benchmarks/load_test.py --drivers 8 --sessions 10
+    FAKE_OPENAI_LATENCY=0.5 python benchmarks/load_test.py --workers 4
+"""
+
+import argparse
+import gc
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+import fakes
+from utils import jobs
+
+PAGES = ["Query.py", "pages/History_Summary.py", "pages/Word_Cloud.py", "pages/Data_Resource.py"]
+TOPICS = ["new iPhone battery", "electric cars", "remote work", "streaming prices", "AI art", "housing market"]
+SCRIPT_TIMEOUT = 600
+
+
+def run_session(session_id, topic, latencies):
+    """
+    Simulates one user: an analysis on the Query page, then a visit to every other page.
+
+    Parameters:
+        session_id (int): Number of the session, used in error messages.
+        topic (str): The topic the user analyses.
+        latencies (dict[str, list[float]]): Script-run latencies per page, appended to.
+
+    Returns:
+        int: The number of script runs that ended with an exception or showed an error.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    errors = 0
+
+    def timed_run(page, app):
+        nonlocal errors
+        start = time.perf_counter()
+        app.run(timeout=SCRIPT_TIMEOUT)
+        latencies[page].append(time.perf_counter() - start)
+        if app.exception:
+            errors += 1
+            print(f"session {session_id} {page}: {app.exception[0].message}")
+        elif app.error:
+            errors += 1
+            print(f"session {session_id} {page}: {app.error[0].value}")
+
+    query = AppTest.from_file(os.path.join(ROOT, "Query.py"), default_timeout=SCRIPT_TIMEOUT)
+    timed_run("Query.py", query)
+    query.text_input[0].input(topic)
+    query.button[0].click()
+    timed_run("Query.py", query)
+    past_queries = query.session_state["past_queries"] if "past_queries" in query.session_state else []
+
+    for page in PAGES[1:]:
+        app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=SCRIPT_TIMEOUT)
+        app.session_state["past_queries"] = past_queries
+        timed_run(page, app)
+        if app.button:
+            app.button[0].click()
+            timed_run(page, app)
+    return errors
+
+
+def sample_threads(stop, samples):
+    """
+    Records the number of live threads every 100ms until `stop` is set.
+    """
+    while not stop.wait(0.1):
+        samples.append(threading.active_count())
+
+
+def run_driver(driver_id, num_sessions, topics, db_path):
+    """
+    Runs simulated sessions one after another in this process, the way a web
+    process serves them, and measures what they leave behind.
+
+    AppTest keeps a single Streamlit runtime per process, so concurrent sessions
+    are simulated by running one driver per process.
+
+    Parameters:
+        driver_id (int): Number of the driver, used to number its sessions.
+        num_sessions (int): Sessions to run.
+        topics (list[str]): Topics the sessions cycle through.
+        db_path (str): The job database shared with the workers.
+
+    Returns:
+        dict: "latencies" per page, "errors", "memory" (traced bytes after each
+            session, garbage collected), "max_threads" and "final_threads".
+    """
+    # AppTest sessions are driven from outside a script thread, which Streamlit warns about
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.getMessage()
+    )
+    os.chdir(ROOT)  # pages load utils/style.css relative to the working directory
+    jobs.DB_PATH = db_path
+    jobs.ANALYSIS_WORKERS = 0  # the pages must not start workers without the fakes
+    fakes.install()
+
+    latencies = {page: [] for page in PAGES}
+    errors = 0
+    memory = []
+    thread_samples = []
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_threads, args=(stop, thread_samples), daemon=True)
+    sampler.start()
+    tracemalloc.start()
+    for i in range(num_sessions):
+        session_id = driver_id * num_sessions + i
+        errors += run_session(session_id, topics[session_id % len(topics)], latencies)
+        gc.collect()
+        memory.append(tracemalloc.get_traced_memory()[0])
+    stop.set()
+    sampler.join()
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "memory": memory,
+        "max_threads": max(thread_samples, default=threading.active_count()),
+        "final_threads": threading.active_count(),
+    }
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile (0-100) of `values`.
+    """
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive many simulated dashboard sessions against fake backends.")
+    parser.add_argument("--drivers", type=int, default=4, help="concurrent sessions, one process each")
+    parser.add_argument("--sessions", type=int, default=5, help="sessions run one after another by each driver")
+    parser.add_argument("--workers", type=int, default=2, help="analysis worker processes")
+    parser.add_argument("--topics", type=int, default=3, help="distinct topics, fewer means more shared jobs")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "load_test_jobs.sqlite3")
+    jobs.ensure_workers(args.workers, initializer=fakes.install, db_path=db_path)
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.drivers) as pool:
+        reports = pool.starmap(
+            run_driver, [(i, args.sessions, TOPICS[:args.topics], db_path) for i in range(args.drivers)]
+        )
+    wall = time.perf_counter() - start
+    total = args.drivers * args.sessions
+    print(f"{total} sessions ({args.drivers} concurrent, {args.workers} workers) in {wall:.1f}s, "
+          f"{sum(report['errors'] for report in reports)} errors")
+
+    print()
+    print(f"{'page':<28}{'runs':>6}{'p50 (s)':>10}{'p90 (s)':>10}{'p99 (s)':>10}{'max (s)':>10}")
+    for page in PAGES:
+        values = [value for report in reports for value in report["latencies"][page]]
+        if not values:
+            continue
+        print(
+            f"{page:<28}{len(values):>6}{percentile(values, 50):>10.2f}{percentile(values, 90):>10.2f}"
+            f"{percentile(values, 99):>10.2f}{max(values):>10.2f}"
+        )
+
+    # The first session warms up imports and caches; growth after it is what each session leaves behind
+    print()
+    print(f"{'driver':<8}{'after 1st (MB)':>16}{'after last (MB)':>17}{'growth/session (KB)':>21}{'threads max/final':>19}")
+    for i, report in enumerate(reports):
+        memory = report["memory"]
+        growth = (memory[-1] - memory[0]) / max(len(memory) - 1, 1) / 1024
+        print(
+            f"{i:<8}{memory[0] / 2**20:>16.1f}{memory[-1] / 2**20:>17.1f}{growth:>21.1f}"
+            f"{report['max_threads']:>11}/{report['final_threads']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
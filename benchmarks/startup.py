@@ -0,0 +1,98 @@
+"""
+Startup Benchmark - Import Time per Page
+========================================
+
+This script measures how long each Streamlit page takes to import its
+dependencies, which is the cost paid on a container cold start and on the
+first switch to a page.
+
+Key functionalities:
+    - Extracts the top-level imports of every page with `ast`, so the page
+      body (and its Streamlit calls) is never executed.
+    - Runs those imports in a fresh interpreter for every repetition, so the
+      numbers are not flattered by modules cached from a previous run.
+    - Reports the median and the worst import time per page.
+
+Example Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 10
+"""
+
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Query.py"] + sorted(
+    os.path.join("pages", name) for name in os.listdir(os.path.join(ROOT, "pages")) if name.endswith(".py")
+)
+
+TIMER = """
+import time
+start = time.perf_counter()
+{imports}
+print(time.perf_counter() - start)
+"""
+
+
+def page_imports(page_path):
+    """
+    Collects the top-level import statements of a page.
+
+    Parameters:
+        page_path (str): Path of the page relative to the repository root.
+
+    Returns:
+        str: The import statements, one per line.
+    """
+    with open(os.path.join(ROOT, page_path), "r") as f:
+        tree = ast.parse(f.read())
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes)
+
+
+def time_imports(imports, repeat):
+    """
+    Times a block of imports in `repeat` fresh interpreters.
+
+    Parameters:
+        imports (str): The import statements to run.
+        repeat (int): Number of fresh interpreters to start.
+
+    Returns:
+        list[float]: Import time of each run in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", TIMER.format(imports=imports)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time per Streamlit page.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per page")
+    args = parser.parse_args()
+
+    print(f"{'page':<28}{'median (ms)':>14}{'max (ms)':>12}")
+    for page in PAGES:
+        try:
+            timings = time_imports(page_imports(page), args.repeat)
+        except subprocess.CalledProcessError as e:
+            reason = (e.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{page:<28}  failed: {reason}")
+            continue
+        print(f"{page:<28}{statistics.median(timings) * 1000:>14.1f}{max(timings) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,18 +12,24 @@ Key Features:
     - Shows a warning if no queries have been generated yet.
 """
 import streamlit as st
-from utils.display import generate_wordcloud_from_text, generate_wordcloud_from_dict
+from utils.ui import sync_past_queries, show_pending_queries
+
 def Data_Resource_page():
     st.title("Data Resource")
 
     # Check if we have any stored queries
-    if "past_queries" not in st.session_state or len(st.session_state["past_queries"]) == 0:
+    past_queries = sync_past_queries()
+    show_pending_queries()
+    if len(past_queries) == 0:
         st.warning("No word clouds have been generated yet.")
         return
 
-    for i, item in enumerate(st.session_state["past_queries"]):
+    for i, item in enumerate(past_queries):
         query_str = item["query"]
         if st.button(f"Query #{i+1}: {query_str}"):
+            if not "reddit_raw_data" in item:
+                st.write("No records.")
+                continue
             st.subheader(f"Data Resources for '{query_str}'")
             st.write(item["reddit_raw_data"])
         st.divider()  # just a horizontal line to separate sections
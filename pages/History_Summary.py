@@ -10,21 +10,28 @@ Key Features:
     - Displays stored sentiment summaries from previous queries.
     - Allows users to click on a query to view its sentiment analysis.
     - Shows a warning if no history is available.
+    - Shows the progress of analyses still running in the job queue.
 """
 
 import streamlit as st
-from utils.display import generate_wordcloud_from_text, generate_wordcloud_from_dict
+from utils.ui import sync_past_queries, show_pending_queries
+
 def History_Summary_page():
     st.title("History Summaries")
 
     # Check if we have any stored queries
-    if "past_queries" not in st.session_state or len(st.session_state["past_queries"]) == 0:
+    past_queries = sync_past_queries()
+    show_pending_queries()
+    if len(past_queries) == 0:
         st.warning("No word clouds have been generated yet.")
         return
 
-    for i, item in enumerate(st.session_state["past_queries"]):
+    for i, item in enumerate(past_queries):
         query_str = item["query"]
         if st.button(f"Query #{i+1}: {query_str}"):
+            if "error" in item:
+                st.error(f"The analysis failed: {item['error']}")
+                continue
             if not "summarize" in item:
                 st.write("No records.")
                 continue
@@ -14,19 +14,25 @@ Key Features:
     - Displays a warning if no word clouds have been generated.
 """
 import streamlit as st
+from utils.ui import sync_past_queries, show_pending_queries
 from utils.display import generate_wordcloud_from_text, generate_wordcloud_from_dict
 
 
 def wordcloud_page():
     st.title("Word Cloud Gallery")
     # Check if we have any stored queries
-    if "past_queries" not in st.session_state or len(st.session_state["past_queries"]) == 0:
+    past_queries = sync_past_queries()
+    show_pending_queries()
+    if len(past_queries) == 0:
         st.warning("No word clouds have been generated yet.")
         return
 
-    for i, item in enumerate(st.session_state["past_queries"]):
+    for i, item in enumerate(past_queries):
         query_str = item["query"]
         if st.button(f"Query #{i+1}: {query_str}"):
+            if not "word_cloud" in item:
+                st.write("No records.")
+                continue
             st.subheader(f"Word Cloud for '{query_str}' from Raw Text")
             data = "".join(["".join([comment[0] for comment in comment_list[1:]]) for comment_list in item["comments_data"]])
             st.image(generate_wordcloud_from_text(data), caption=f"Word Cloud for '{query_str}'", width = 1000)
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+
+@pytest.fixture
+def job_db(tmp_path, monkeypatch):
+    """A fresh job database, used by default by every `utils.jobs` function."""
+    from utils import jobs
+
+    db_path = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(jobs, "DB_PATH", db_path)
+    return db_path
@@ -0,0 +1,111 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import analysis, models
+from utils.coalesce import SingleFlight
+
+POST = {
+    "id": "abc123",
+    "title": "New phone battery",
+    "text_content": "How long does yours last?",
+    "post_url": "https://www.reddit.com/r/phones/comments/abc123/",
+    "link_url": "https://www.reddit.com/r/phones/comments/abc123/",
+}
+
+
+def test_post_is_summarized_once_across_settings_and_processes(job_db, monkeypatch):
+    calls = []
+
+    def summarize(post, top_comments):
+        calls.append(top_comments)
+        return "A summary"
+
+    monkeypatch.setattr(analysis, "_summarize_post_content", summarize)
+    monkeypatch.setattr(analysis, "_post_summaries", SingleFlight())
+
+    # Different slider settings fetch different comments for the same post
+    assert analysis.summarize_post(POST, [("great", 150), ("bad", 120)]) == "A summary"
+    assert analysis.summarize_post(POST, [("great", 150)]) == "A summary"
+
+    # Another worker process starts with an empty in-process cache
+    monkeypatch.setattr(analysis, "_post_summaries", SingleFlight())
+    assert analysis.summarize_post(POST, [("bad", 120)]) == "A summary"
+    assert len(calls) == 1
+
+
+def test_edited_post_is_summarized_again(job_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(analysis, "_summarize_post_content", lambda post, top: calls.append(post) or "A summary")
+    monkeypatch.setattr(analysis, "_post_summaries", SingleFlight())
+
+    analysis.summarize_post(POST)
+    analysis.summarize_post({**POST, "text_content": "Edited: it lasts a day."})
+    assert len(calls) == 2
+
+
+SCORES = {"joy": 50, "sadness": 10, "anger": 10, "fear": 10, "surprise": 10, "disgust": 10, "key words": ["battery"]}
+
+
+def test_topic_scores_match_topics_ignoring_case_and_spacing():
+    reply = json.dumps({"scores": {"apple": SCORES, "SAMSUNG  galaxy": None}, "confidence": 0.8})
+    parsed = analysis._parse_topic_scores(f"```json\n{reply}\n```", ["Apple", "Samsung Galaxy"])
+    assert parsed["confidence"] == 0.8
+    assert parsed["scores"]["Samsung Galaxy"] is None
+    assert parsed["scores"]["Apple"]["joy"] == 50.0
+    assert parsed["scores"]["Apple"]["key words"] == ["battery"]
+    assert "confidence" not in parsed["scores"]["Apple"]
+
+
+def test_topic_scores_reject_missing_topics_and_emotions():
+    with pytest.raises(KeyError):
+        analysis._parse_topic_scores(json.dumps({"scores": {"Apple": SCORES}}), ["Apple", "Samsung"])
+    with pytest.raises(KeyError):
+        analysis._parse_topic_scores(json.dumps({"scores": {"Apple": {"joy": 100}}}), ["Apple"])
+    with pytest.raises(ValueError):
+        analysis._parse_topic_scores("Apple fans are happy", ["Apple"])
+
+
+def _reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_sentiment_towards_topics_is_weighted_by_score(monkeypatch):
+    replies = iter([
+        "I cannot tell",
+        json.dumps({"scores": {"Apple": dict(SCORES), "Samsung": None}, "confidence": 0.9}),
+    ])
+    monkeypatch.setattr(models, "route", lambda task: models.CASCADE)
+    monkeypatch.setattr(models, "create", lambda task, messages, model=None, **kwargs: _reply(next(replies)))
+
+    topic_scores = analysis.analyze_sentiment_topics(["Apple", "Samsung"], "A phone thread", ("Love my iPhone", 3))
+    assert topic_scores["Samsung"] is None
+    assert topic_scores["Apple"]["joy"] == 150
+    assert topic_scores["Apple"]["key words"] == ["battery"]
+
+    # A text no model could score is dropped
+    monkeypatch.setattr(models, "create", lambda task, messages, model=None, **kwargs: _reply("?"))
+    assert analysis.analyze_sentiment_topics(["Apple", "Samsung"], "A phone thread", ("Meh", 1)) is None
+
+
+def test_compare_data_splits_comments_by_topic(monkeypatch):
+    def analyze(topics, context, text_and_score):
+        text, score = text_and_score
+        return {topic: ({**SCORES, "joy": score} if topic.lower() in text.lower() else None) for topic in topics}
+
+    monkeypatch.setattr(analysis, "summarize_post", lambda post, comments=(): "A phone thread")
+    monkeypatch.setattr(analysis, "analyze_sentiment_topics", analyze)
+    monkeypatch.setattr(analysis, "summarize_sentiment", lambda texts, detail: f"{len(texts)} texts")
+
+    post_list = [
+        ["https://www.reddit.com/a", ("Apple battery is great", 5), ("Apple and Samsung both", 7)],
+        ["https://www.reddit.com/b", ("Samsung screen", 2), ("Off topic", 9)],
+    ]
+    result = analysis.compare_data(post_list, ["Apple", "Samsung", "Nokia"], 3)
+    assert result["Apple"]["emotion_score"]["joy"] == 12
+    assert result["Samsung"]["emotion_score"]["joy"] == 9
+    assert result["Apple"]["word_cloud"] == {"battery": 2}
+    assert result["Apple"]["summarize"] == "2 texts"
+    assert result["Nokia"]["emotion_score"] == dict.fromkeys(analysis.EMOTIONS, 0)
+    assert result["Nokia"]["summarize"] == "No comments about this topic were found."
@@ -0,0 +1,90 @@
+import json
+
+from utils.archive_source import ArchiveSource
+
+NOW = 1_700_000_000
+
+
+def _submission(post_id, score, title="Phone battery life", **fields):
+    return {"id": post_id, "title": title, "selftext": "", "score": score, "num_comments": 3,
+            "subreddit": "phones", "created_utc": NOW, "url": "https://example.com", **fields}
+
+
+def _comment(comment_id, post_id, score, body="Lasts all day"):
+    return {"id": comment_id, "link_id": f"t3_{post_id}", "parent_id": f"t3_{post_id}", "score": score, "body": body}
+
+
+def _source(tmp_path, submissions, comments=(), **kwargs):
+    paths = []
+    for name, records in (("RS.ndjson", submissions), ("RC.ndjson", comments)):
+        path = tmp_path / name
+        path.write_text("".join(json.dumps(record) + "\n" for record in records))
+        paths.append(str(path))
+    return ArchiveSource(*paths, **kwargs)
+
+
+def test_duplicated_submissions_are_returned_once(tmp_path):
+    # Overlapping dumps: the same submission, with the same score, several times
+    source = _source(tmp_path, [_submission("a", 10), _submission("a", 10), _submission("b", 5), _submission("a", 10)])
+    assert [post["id"] for post in source.find_posts("battery", 2)] == ["a", "b"]
+    assert [post["id"] for post in source.find_posts("battery", 5)] == ["a", "b"]
+
+
+def test_string_scores_of_older_dumps(tmp_path):
+    source = _source(
+        tmp_path,
+        [_submission("a", "7"), _submission("b", "12")],
+        [_comment("c1", "a", "150"), _comment("c2", "a", "20")],
+    )
+    posts = source.find_posts("battery", 5)
+    assert [(post["id"], post["score"]) for post in posts] == [("b", 12), ("a", 7)]
+    assert source.collect_comments(posts, min_upvotes=100) == [
+        [posts[0]["post_url"]],
+        [posts[1]["post_url"], ("Lasts all day", 150)],
+    ]
+
+
+def test_duplicated_comments_are_kept_once(tmp_path):
+    source = _source(tmp_path, [_submission("a", 10)], [_comment("c1", "a", 150)] * 3)
+    posts = source.find_posts("battery", 1)
+    assert source.collect_comments(posts, min_upvotes=100) == [[posts[0]["post_url"], ("Lasts all day", 150)]]
+
+
+def test_min_post_score(tmp_path):
+    source = _source(tmp_path, [_submission("a", 3), _submission("b", 50)], min_post_score=10)
+    assert [post["id"] for post in source.find_posts("battery", 5)] == ["b"]
+
+
+def test_several_keywords_share_one_comment_scan(tmp_path):
+    source = _source(
+        tmp_path,
+        [_submission("a", 10, "Phone battery and camera"), _submission("b", 5, "Camera only")],
+        [_comment("c1", "a", 150), _comment("c2", "b", 150)],
+    )
+    posts, results = source.get_comments(["battery", "camera"], 5, 1, 100, False)
+    assert [post["id"] for post in posts] == ["a", "b"]
+    assert len(results) == 2
+
+
+def test_from_env_reads_the_minimum_score(monkeypatch):
+    monkeypatch.setenv("ARCHIVE_SUBMISSIONS", "RS.zst")
+    monkeypatch.setenv("ARCHIVE_COMMENTS", "RC.zst")
+    monkeypatch.setenv("ARCHIVE_MIN_SCORE", "25")
+    assert ArchiveSource.from_env().min_post_score == 25
+
+
+def test_non_ascii_keywords_match_escaped_dumps(tmp_path):
+    # json.dumps escapes non-ASCII text as \uXXXX, as many dump writers do
+    source = _source(tmp_path, [_submission("a", 10, "Best café battery"), _submission("b", 5, "Cafe racer")])
+    assert "\\u00e9" in (tmp_path / "RS.ndjson").read_text()
+    assert [post["id"] for post in source.find_posts("café", 3)] == ["a"]
+    assert [post["id"] for post in source.find_posts("Café battery", 3)] == ["a"]
+
+
+def test_keywords_match_whole_words(tmp_path):
+    source = _source(tmp_path, [
+        _submission("a", 10, "He said it again"),
+        _submission("b", 5, "AI art is everywhere"),
+        _submission("c", 3, "Is the new AI-powered phone worth it?"),
+    ])
+    assert [post["id"] for post in source.find_posts("ai", 5)] == ["b", "c"]
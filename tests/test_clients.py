@@ -0,0 +1,16 @@
+import openai
+
+from utils import clients
+
+
+def test_openai_client_is_built_without_fakes(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(clients, "_openai_client", None)
+
+    client = clients.get_openai_client()
+    try:
+        assert isinstance(client, openai.OpenAI)
+        assert isinstance(client._client, openai.DefaultHttpxClient)
+        assert clients.get_openai_client() is client
+    finally:
+        client.close()
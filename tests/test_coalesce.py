@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from utils import coalesce
+from utils.coalesce import SingleFlight
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test moves forward by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(coalesce, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def waiting(monkeypatch):
+    """Released once for every caller that starts waiting on another's computation."""
+    semaphore = threading.Semaphore(0)
+
+    class Event(threading.Event):
+        def wait(self, timeout=None):
+            semaphore.release()
+            return super().wait(timeout)
+
+    monkeypatch.setattr(coalesce, "threading", SimpleNamespace(Event=Event, Lock=threading.Lock))
+    return semaphore
+
+
+def test_concurrent_callers_share_one_call(waiting):
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flight.do, "key", compute, 21)
+        started.wait(5)
+        waiters = [executor.submit(flight.do, "key", compute, 21) for _ in range(3)]
+        for _ in waiters:
+            assert waiting.acquire(timeout=5)
+        release.set()
+        assert leader.result() == (42, False)
+        assert [waiter.result() for waiter in waiters] == [(42, True)] * 3
+    assert calls == [21]
+    # Follow-up calls are served from the cache
+    assert flight.do("key", compute, 21) == (42, True)
+    assert calls == [21]
+
+
+def test_errors_reach_waiters_and_are_not_cached(waiting):
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", fail)
+        started.wait(5)
+        waiter = executor.submit(flight.do, "key", fail)
+        assert waiting.acquire(timeout=5)
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            waiter.result()
+    assert calls == [1]
+
+    assert flight.do("key", lambda: "ok") == ("ok", False)
+    assert flight.do("key", lambda: "other") == ("ok", True)
+
+
+def test_results_expire_after_the_ttl(clock):
+    flight = SingleFlight(ttl=10)
+    assert flight.do("key", lambda: 1) == (1, False)
+    clock[0] += 9
+    assert flight.do("key", lambda: 2) == (1, True)
+    clock[0] += 2
+    assert flight.do("key", lambda: 3) == (3, False)
+
+
+def test_oldest_results_are_evicted_beyond_max_entries():
+    flight = SingleFlight(max_entries=2)
+    for key in "abc":
+        flight.do(key, lambda key=key: key)
+    assert list(flight._results) == ["b", "c"]
+    assert flight.do("a", lambda: "again") == ("again", False)
+    assert flight.do("c", lambda: "again") == ("c", True)
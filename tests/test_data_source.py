@@ -0,0 +1,204 @@
+import threading
+import time
+from itertools import islice
+from types import SimpleNamespace
+
+import pytest
+
+from utils import data_source, pipeline
+from utils.data_source import DataSource, RedditSource, SpeculativeFetch, get_comments_parallel, get_data_source
+
+
+def test_data_source_is_abstract():
+    with pytest.raises(TypeError):
+        DataSource()
+
+    class Incomplete(DataSource):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_get_data_source():
+    assert isinstance(get_data_source("reddit"), RedditSource)
+    with pytest.raises(ValueError):
+        get_data_source("twitter")
+
+
+class FakeReddit:
+    """Search results per keyword, counting the searches and comment fetches made."""
+
+    def __init__(self, results):
+        self.results = results
+        self.searches = []
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def iter_reddit_posts(self, subreddit="all", keyword=None, **kwargs):
+        with self.lock:
+            self.searches.append((subreddit, keyword))
+        for post_id in self.results[keyword]:
+            yield {"id": post_id, "title": post_id, "post_url": f"https://www.reddit.com/{post_id}"}
+
+    def get_datas(self, post, comment_depth, min_upvotes):
+        with self.lock:
+            self.fetched.append(post["id"])
+        return [post["post_url"], (f"comment on {post['id']}", 10)]
+
+
+@pytest.fixture
+def fake_reddit(monkeypatch):
+    def install(results):
+        fake = FakeReddit(results)
+        monkeypatch.setattr(data_source, "iter_reddit_posts", fake.iter_reddit_posts)
+        monkeypatch.setattr(data_source, "get_datas", fake.get_datas)
+        return fake
+    return install
+
+
+def test_matching_speculation_is_used_as_is(fake_reddit):
+    fake = fake_reddit({"battery life": ["a", "b"]})
+    prefetch = SpeculativeFetch("battery life", 2, 0, 0)
+    posts, results = get_comments_parallel("Life battery", 2, 0, 0, False, prefetch=prefetch)
+    assert [post["id"] for post in posts] == ["a", "b"]
+    assert sorted(data[0] for data in results) == ["https://www.reddit.com/a", "https://www.reddit.com/b"]
+    assert fake.searches == [("all", "battery life")]
+    assert sorted(fake.fetched) == ["a", "b"]
+
+
+def test_speculation_comments_are_reused_by_another_search(fake_reddit):
+    fake = fake_reddit({"phone": ["a", "b", "c"], "phone battery": ["b", "c", "d"]})
+    prefetch = SpeculativeFetch("phone", 3, 0, 0)
+    prefetch._search.result()
+    posts, results = get_comments_parallel("phone battery", 3, 0, 0, False, prefetch=prefetch)
+    assert [post["id"] for post in posts] == ["b", "c", "d"]
+    assert sorted(data[0] for data in results) == [f"https://www.reddit.com/{post_id}" for post_id in "bcd"]
+    # b and c were fetched once, by the speculation
+    assert sorted(fake.fetched.count(post_id) for post_id in "bcd") == [1, 1, 1]
+    assert fake.searches == [("all", "phone"), ("all", "phone battery")]
+    with pytest.raises(RuntimeError):
+        prefetch.executor.submit(print)
+
+
+def test_cancel_stops_the_search_and_drops_untaken_fetches(monkeypatch):
+    resume = threading.Event()
+    fetched = []
+
+    def iter_reddit_posts(subreddit="all", keyword=None, **kwargs):
+        yield {"id": "a", "title": "a", "post_url": "https://www.reddit.com/a"}
+        resume.wait(5)
+        yield {"id": "b", "title": "b", "post_url": "https://www.reddit.com/b"}
+
+    monkeypatch.setattr(data_source, "iter_reddit_posts", iter_reddit_posts)
+    monkeypatch.setattr(data_source, "get_datas", lambda post, *args: fetched.append(post["id"]))
+    # With one thread, the fetch of "a" waits behind the search that is still running
+    prefetch = SpeculativeFetch("guess", 2, 0, 0, max_workers=1)
+    while "a" not in prefetch._futures:
+        time.sleep(0.01)
+    future = prefetch._futures["a"]
+    prefetch.cancel()
+    resume.set()
+    prefetch._search.result(timeout=5)
+    assert future.cancelled()
+    assert [post["id"] for post in prefetch._posts] == ["a"]
+    assert prefetch.take("a") is None
+    assert fetched == []
+
+
+def test_no_speculation_with_ai_partitioning(monkeypatch):
+    speculated = []
+
+    class Source(DataSource):
+        label = "test"
+
+        def speculate(self, *args):
+            speculated.append(args)
+
+        def get_comments(self, keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning, prefetch=None):
+            return [], []
+
+    monkeypatch.setattr(pipeline, "get_data_source", lambda source: Source())
+    monkeypatch.setattr(pipeline, "input_summarize", lambda user_input: user_input)
+    monkeypatch.setattr(pipeline, "analyze_data", lambda *args, **kwargs: ({}, [], ""))
+    pipeline.run_analysis("phone battery", 3, 0, 0, True, 5)
+    assert speculated == []
+    pipeline.run_analysis("phone battery", 3, 0, 0, False, 5)
+    assert len(speculated) == 1
+
+
+class FakeListing:
+    """A PRAW listing of posts with the given ages in days, counting the pages read."""
+
+    def __init__(self, ages):
+        now = time.time()
+        self.posts = [
+            SimpleNamespace(id=str(i), title=f"post {i}", score=1, num_comments=0, permalink=f"/r/test/comments/{i}/",
+                            url=None, created_utc=now - age * 86400, selftext="")
+            for i, age in enumerate(ages)
+        ]
+        self.read = 0
+        self.calls = []
+
+    def listing(self, name, **kwargs):
+        self.calls.append((name, kwargs))
+        for post in self.posts[:kwargs["limit"]]:
+            self.read += 1
+            yield post
+
+    @property
+    def pages(self):
+        return -(-self.read // data_source.REDDIT_PAGE_SIZE)
+
+
+@pytest.fixture
+def fake_listing(monkeypatch):
+    def install(ages):
+        listing = FakeListing(ages)
+        subreddit = SimpleNamespace(**{
+            name: (lambda *args, name=name, **kwargs: listing.listing(name, **kwargs))
+            for name in ("search", "new", "top", "hot")
+        })
+        monkeypatch.setattr(data_source, "get_reddit", lambda: SimpleNamespace(subreddit=lambda name: subreddit))
+        return listing
+    return install
+
+
+def test_time_filter_covers_the_window():
+    assert data_source._time_filter(0.5 / 24) == "hour"
+    assert data_source._time_filter(1) == "day"
+    assert data_source._time_filter(30) == "month"
+    assert data_source._time_filter(90) == "year"
+    assert data_source._time_filter(1000) == "all"
+
+
+def test_posts_fill_the_quota_across_pages(fake_listing):
+    # Every other post is older than the window
+    listing = fake_listing([1, 200] * 150)
+    posts = list(islice(data_source.iter_reddit_posts(keyword="phone", days=90, max_pages=3), 120))
+    assert len(posts) == 120
+    assert listing.pages == 3
+    assert listing.calls == [("search", {"sort": "hot", "time_filter": "year", "limit": 3 * data_source.REDDIT_PAGE_SIZE})]
+
+
+def test_pages_are_read_only_as_far_as_the_caller_iterates(fake_listing):
+    listing = fake_listing([1] * 300)
+    assert len(list(islice(data_source.iter_reddit_posts(keyword="phone"), 10))) == 10
+    assert listing.pages == 1
+
+
+def test_new_listings_stop_at_the_first_old_post(fake_listing):
+    listing = fake_listing([1, 2, 100, 3, 4])
+    posts = list(data_source.iter_reddit_posts(sort="new", days=90))
+    assert [post["id"] for post in posts] == ["0", "1"]
+    assert listing.read == 3
+    assert listing.calls == [("new", {"limit": data_source.MAX_PAGES * data_source.REDDIT_PAGE_SIZE})]
+
+
+def test_other_listings_stop_after_a_page_of_old_posts(fake_listing):
+    page = data_source.REDDIT_PAGE_SIZE
+    listing = fake_listing([1] + [100] * (page - 1) + [2] + [100] * page + [3])
+    posts = list(data_source.iter_reddit_posts(sort="top", days=90, max_pages=5))
+    assert [post["id"] for post in posts] == ["0", str(page)]
+    assert listing.read == 2 * page + 1
+    assert listing.calls == [("top", {"time_filter": "year", "limit": 5 * page})]
@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from utils import jobs
+
+PARAMS = {
+    "user_input": "New iPhone battery",
+    "num_results": 10,
+    "comment_depth": 2,
+    "min_upvotes": 100,
+    "use_ai_partitioning": False,
+    "summarize_detailed": 2,
+    "source": "reddit",
+}
+
+
+def _set(job_id, **columns):
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    jobs._connect().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+
+def test_identical_submissions_share_a_job(job_db):
+    job_id, reused = jobs.submit_job(PARAMS)
+    assert not reused
+    same_id, reused = jobs.submit_job({**PARAMS, "user_input": "  new   IPHONE battery "})
+    assert (same_id, reused) == (job_id, True)
+
+    other_id, reused = jobs.submit_job({**PARAMS, "num_results": 20})
+    assert other_id != job_id and not reused
+    assert jobs.get_job(job_id)["status"] == jobs.QUEUED
+
+
+def test_finished_jobs_are_reused_until_they_expire(job_db):
+    job_id, _ = jobs.submit_job(PARAMS)
+    _set(job_id, status=jobs.DONE, finished_at=time.time())
+    assert jobs.submit_job(PARAMS) == (job_id, True)
+
+    _set(job_id, finished_at=time.time() - jobs.RESULT_TTL - 1)
+    new_id, reused = jobs.submit_job(PARAMS)
+    assert new_id != job_id and not reused
+
+
+def test_failed_jobs_are_not_reused(job_db):
+    job_id, _ = jobs.submit_job(PARAMS)
+    _set(job_id, status=jobs.FAILED, finished_at=time.time())
+    assert jobs.submit_job(PARAMS)[0] != job_id
+
+
+def test_claim_takes_the_oldest_queued_job_once(job_db):
+    first, _ = jobs.submit_job(PARAMS)
+    second, _ = jobs.submit_job({**PARAMS, "num_results": 20})
+
+    job = jobs._claim_job(job_db)
+    assert job["id"] == first
+    assert job["params"] == PARAMS
+    claimed = jobs.get_job(first)
+    assert claimed["status"] == jobs.RUNNING and claimed["attempts"] == 1
+
+    assert jobs._claim_job(job_db)["id"] == second
+    assert jobs._claim_job(job_db) is None
+
+
+def test_job_of_a_dead_worker_is_retried_then_failed(job_db):
+    job_id, _ = jobs.submit_job(PARAMS)
+    jobs._claim_job(job_db)
+    assert jobs._claim_job(job_db) is None  # heartbeat is fresh, the job is not stolen
+
+    _set(job_id, heartbeat_at=time.time() - jobs.STALE_AFTER - 1)
+    assert jobs._claim_job(job_db)["id"] == job_id
+    assert jobs.get_job(job_id)["attempts"] == jobs.MAX_ATTEMPTS
+
+    _set(job_id, heartbeat_at=time.time() - jobs.STALE_AFTER - 1)
+    assert jobs._claim_job(job_db) is None
+    failed = jobs.get_job(job_id)
+    assert failed["status"] == jobs.FAILED
+    assert "stopped" in failed["error"]
+
+
+def test_run_job_stores_the_result(job_db, monkeypatch):
+    def analysis(progress, on_summary, **params):
+        progress("Half way")
+        on_summary("Partial")
+        return {"summarize": "Done", "user_input": params["user_input"]}
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "analysis", analysis)
+    job_id, _ = jobs.submit_job(PARAMS)
+    jobs._run_job(jobs._claim_job(job_db), job_db)
+
+    job = jobs.get_job(job_id)
+    assert job["status"] == jobs.DONE
+    assert job["result"] == {"summarize": "Done", "user_input": PARAMS["user_input"]}
+    assert jobs.wait_for_job(job_id)["status"] == jobs.DONE
+
+
+def test_run_job_records_a_failure(job_db, monkeypatch):
+    def analysis(**kwargs):
+        raise ValueError("Reddit is down")
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "analysis", analysis)
+    job_id, _ = jobs.submit_job(PARAMS)
+    jobs._run_job(jobs._claim_job(job_db), job_db)
+
+    job = jobs.get_job(job_id)
+    assert job["status"] == jobs.FAILED
+    assert job["error"] == "Reddit is down"
+    assert job["finished_at"] is not None
+
+
+def test_unknown_job_raises(job_db):
+    with pytest.raises(KeyError):
+        jobs.wait_for_job("missing")
+
+
+def test_processes_can_open_a_new_database_at_once(tmp_path):
+    db_path = str(tmp_path / "fresh.sqlite3")
+    with multiprocessing.get_context("spawn").Pool(8) as pool:
+        assert pool.starmap(jobs.get_job, [("missing", db_path)] * 16) == [None] * 16
+
+
+def _replay(monkeypatch, states):
+    """Makes `get_job` return a job going through the given (status, partial, final summary) states."""
+    states = iter(states)
+
+    def get_job(job_id, db_path=None):
+        status, partial, final = next(states)
+        return {"status": status, "partial_summary": partial, "result": {"summarize": final} if final else None}
+
+    monkeypatch.setattr(jobs, "get_job", get_job)
+
+
+def test_stream_summary_follows_the_partial_summary(monkeypatch):
+    _replay(monkeypatch, [
+        (jobs.RUNNING, "Hello wor", None),
+        (jobs.RUNNING, "Hello world, people", None),
+        (jobs.DONE, None, "Hello world, people are happy."),
+    ])
+    assert "".join(jobs.stream_summary("job", poll_interval=0)) == "Hello world, people are happy."
+
+
+def test_stream_summary_restarts_after_a_retry(monkeypatch):
+    _replay(monkeypatch, [
+        (jobs.RUNNING, "First attempt", None),
+        (jobs.RUNNING, None, None),  # requeued after the worker died
+        (jobs.RUNNING, "Second", None),
+        (jobs.DONE, None, "Second attempt."),
+    ])
+    text = "".join(jobs.stream_summary("job", poll_interval=0))
+    assert text.startswith("First attempt")
+    assert text.endswith("restarted, updated summary:*\n\nSecond attempt.")
+
+
+def test_requeued_job_forgets_its_partial_summary(job_db):
+    job_id, _ = jobs.submit_job(PARAMS)
+    jobs._claim_job(job_db)
+    _set(job_id, partial_summary="Half a sum", heartbeat_at=time.time() - jobs.STALE_AFTER - 1)
+    jobs._claim_job(job_db)
+    assert jobs.get_job(job_id)["partial_summary"] is None
+
+
+def test_streamed_summary_is_stripped_like_the_final_one(monkeypatch):
+    from utils import analysis
+
+    monkeypatch.setattr(analysis.models, "stream", lambda *args, **kwargs: iter(["\n\nHello", " wor", "ld\n"]))
+    partials = []
+    final = analysis.summarize_sentiment(["text"], 2, on_text=partials.append)
+    assert final == "Hello world"
+    assert all(final.startswith(partial.rstrip()) for partial in partials)
+    assert partials[0] == "Hello"
+
+
+@pytest.fixture
+def stop_workers():
+    yield
+    with jobs._pool_lock:
+        for process in jobs._pool:
+            process.terminate()
+            process.join()
+        jobs._pool.clear()
+
+
+def test_worker_keeps_post_summaries_in_its_own_database(tmp_path, monkeypatch, stop_workers):
+    import fakes
+
+    default_db = str(tmp_path / "default.sqlite3")
+    worker_db = str(tmp_path / "worker.sqlite3")
+    # Spawned workers read these when they import their modules
+    monkeypatch.setenv("JOBS_DB", default_db)
+    monkeypatch.setenv("FAKE_REDDIT_LATENCY", "0")
+    monkeypatch.setenv("FAKE_OPENAI_LATENCY", "0")
+
+    jobs.ensure_workers(1, initializer=fakes.install, db_path=worker_db)
+    job_id, _ = jobs.submit_job({**PARAMS, "num_results": 2, "comment_depth": 1, "min_upvotes": 0}, db_path=worker_db)
+    job = jobs.wait_for_job(job_id, poll_interval=0.1, db_path=worker_db)
+
+    assert job["status"] == jobs.DONE, job["error"]
+    summaries = jobs._connect(worker_db).execute("SELECT COUNT(*) FROM post_summaries").fetchone()[0]
+    assert summaries == 2
+    assert not os.path.exists(default_db)
@@ -0,0 +1,115 @@
+import importlib
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import models
+
+
+class FakeClient:
+    """Answers each model with its canned reply and records the models called."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model, messages, **kwargs):
+        self.calls.append(model)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.replies[model]))],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=100),
+        )
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    def install(replies):
+        client = FakeClient(replies)
+        monkeypatch.setattr(models, "get_openai_client", lambda: client)
+        return client
+    models.reset_usage()
+    yield install
+    models.reset_usage()
+
+
+@pytest.fixture
+def reload_models(monkeypatch):
+    """Re-reads the MODEL_* routes after the environment is changed."""
+    yield lambda: importlib.reload(models)
+    monkeypatch.undo()
+    importlib.reload(models)
+
+
+def _confident(result):
+    return result["confidence"] >= models.CASCADE_MIN_CONFIDENCE
+
+
+def _scoring():
+    return models.cascade(models.COMMENT_SCORING, [], parse=json.loads, accept=_confident)
+
+
+def test_cascade_stops_at_an_acceptable_small_model_reply(fake_client):
+    client = fake_client({models.SMALL_MODEL: '{"confidence": 0.9}', models.LARGE_MODEL: '{"confidence": 1}'})
+    assert _scoring() == {"confidence": 0.9}
+    assert client.calls == [models.SMALL_MODEL]
+
+
+def test_cascade_escalates_unparseable_replies(fake_client):
+    client = fake_client({models.SMALL_MODEL: "Sure! Here are the scores", models.LARGE_MODEL: '{"confidence": 1}'})
+    assert _scoring() == {"confidence": 1}
+    assert client.calls == [models.SMALL_MODEL, models.LARGE_MODEL]
+    small = next(row for row in models.usage_report() if row["model"] == models.SMALL_MODEL)
+    assert small["escalation_rate"] == 1
+
+
+def test_cascade_escalates_low_confidence_replies(fake_client):
+    client = fake_client({models.SMALL_MODEL: '{"confidence": 0.2}', models.LARGE_MODEL: '{"confidence": 0.3}'})
+    # The last model's result is returned even if it is not accepted
+    assert _scoring() == {"confidence": 0.3}
+    assert client.calls == [models.SMALL_MODEL, models.LARGE_MODEL]
+
+
+def test_cascade_raises_if_the_last_model_is_unparseable(fake_client):
+    client = fake_client({models.SMALL_MODEL: "?", models.LARGE_MODEL: "?"})
+    with pytest.raises(ValueError):
+        _scoring()
+
+
+def test_routes_are_overridden_from_the_environment(fake_client, reload_models, monkeypatch):
+    monkeypatch.setenv("MODEL_COMMENT_SCORING", "gpt-4o")
+    monkeypatch.setenv("MODEL_KEYWORD_EXTRACTION", "gpt-4o-mini")
+    reload_models()
+    assert models.route(models.COMMENT_SCORING) == "gpt-4o"
+    assert models.route(models.KEYWORD_EXTRACTION) == "gpt-4o-mini"
+
+    # Without CASCADE, the routed model answers once, whatever its confidence
+    client = fake_client({"gpt-4o": '{"confidence": 0.1}', "gpt-4o-mini": "[]"})
+    assert _scoring() == {"confidence": 0.1}
+    assert client.calls == ["gpt-4o"]
+    models.create(models.KEYWORD_EXTRACTION, [])
+    assert client.calls == ["gpt-4o", "gpt-4o-mini"]
+
+
+def test_usage_report_since_a_snapshot(fake_client):
+    client = fake_client({models.LARGE_MODEL: "ok"})
+    models.create(models.POST_SUMMARY, [])
+    snapshot = models.usage_snapshot()
+    models.create(models.POST_SUMMARY, [])
+    models.create(models.FINAL_SUMMARY, [])
+
+    report = models.usage_report(since=snapshot)
+    assert [(row["task"], row["calls"]) for row in report] == [(models.FINAL_SUMMARY, 1), (models.POST_SUMMARY, 1)]
+    assert report[1]["prompt_tokens"] == 1000 and report[1]["completion_tokens"] == 100
+    assert report[1]["cost_usd"] == round((1000 * 2.50 + 100 * 10.00) / 1_000_000, 4)
+    assert [row["calls"] for row in models.usage_report()] == [1, 2]
+    assert len(client.calls) == 3
+
+
+def test_unknown_prices_are_not_reported_as_free(fake_client):
+    fake_client({"gpt-5-preview": "ok"})
+    models.create(models.POST_SUMMARY, [], model="gpt-5-preview")
+    (row,) = models.usage_report()
+    assert row["model"] == "gpt-5-preview" and row["calls"] == 1
+    assert row["cost_usd"] is None
@@ -0,0 +1,76 @@
+import json
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+from utils import jobs
+
+PARAMS = {
+    "num_results": 10,
+    "comment_depth": 2,
+    "min_upvotes": 100,
+    "use_ai_partitioning": False,
+    "summarize_detailed": 2,
+    "source": "reddit",
+}
+EMOTIONS = {"joy": 30, "sadness": 10, "anger": 20, "fear": 5, "surprise": 20, "disgust": 15}
+
+
+def _finish(job_id, topics):
+    result = {
+        "topics": topics,
+        "keywords": topics,
+        "reddit_raw_data": [],
+        "comments_data": [],
+        "comparison": {
+            topic: {"emotion_score": EMOTIONS, "word_cloud": {"battery": 1}, "summarize": f"About {topic}"}
+            for topic in topics
+        },
+        "word_cloud": {"battery": 2},
+        "summarize": "\n\n".join(f"#### {topic}\nAbout {topic}" for topic in topics),
+        "usage": [],
+    }
+    jobs._connect().execute(
+        "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+        (jobs.DONE, json.dumps(result), time.time(), job_id),
+    )
+
+
+def test_comparison_typed_with_other_casing_joins_the_same_job(job_db, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(jobs, "ANALYSIS_WORKERS", 0)
+    job_id, _ = jobs.submit_job({"topics": ["Apple", "Samsung"], **PARAMS}, kind="comparison")
+    _finish(job_id, ["Apple", "Samsung"])
+
+    app = AppTest.from_file(f"{ROOT}/Query.py", default_timeout=30)
+    app.run()
+    app.toggle[0].set_value(True).run()
+    app.text_area[0].input("apple\nsamsung")
+    app.button[0].click().run()
+
+    assert not app.exception
+    assert not app.error
+    assert app.session_state["past_queries"][0]["job_id"] == job_id
+    assert [element.value for element in app.markdown if element.value.startswith("####")] == ["#### Apple", "#### Samsung"]
+
+
+def test_topics_that_differ_in_case_or_spacing_count_once(job_db, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(jobs, "ANALYSIS_WORKERS", 0)
+    job_id, _ = jobs.submit_job({"topics": ["Apple", "Samsung Galaxy"], **PARAMS}, kind="comparison")
+    _finish(job_id, ["Apple", "Samsung Galaxy"])
+
+    app = AppTest.from_file(f"{ROOT}/Query.py", default_timeout=30)
+    app.run()
+    app.toggle[0].set_value(True).run()
+    app.text_area[0].input("Apple\napple\n  APPLE \nSamsung  Galaxy\nsamsung galaxy")
+    app.button[0].click().run()
+
+    assert not app.exception
+    assert not app.error
+    assert app.session_state["past_queries"][0]["job_id"] == job_id
+
+    app.text_area[0].input("Apple\napple")
+    app.button[0].click().run()
+    assert len(app.error) == 1 and app.error[0].value.startswith("Please enter between 2 and")
@@ -0,0 +1,122 @@
+import http.server
+import socket
+import socketserver
+import threading
+
+from utils import web
+
+
+def _resolve_to(address):
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+    return getaddrinfo
+
+
+def test_non_public_hosts_are_refused():
+    for url in ("http://169.254.169.254/latest/meta-data/", "http://localhost:8501", "http://10.0.0.1/",
+                "http://[::1]/", "http://0.0.0.0/"):
+        assert not web.is_public_host(url), url
+
+
+def test_public_host_is_accepted(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve_to("93.184.216.34"))
+    assert web.is_public_host("https://example.com/article")
+
+
+def test_hostname_resolving_to_private_address_is_refused(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve_to("192.168.1.10"))
+    assert not web.is_public_host("https://innocent.example/")
+
+
+class _Response:
+    def __init__(self, location):
+        self.is_redirect = True
+        self.headers = {"Location": location}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Session:
+    def __init__(self, location):
+        self.location = location
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        assert kwargs["allow_redirects"] is False
+        self.requested.append((url, kwargs["headers"]["Host"]))
+        return _Response(self.location)
+
+
+def test_redirect_to_private_address_is_not_followed(monkeypatch):
+    session = _Session("http://169.254.169.254/latest/meta-data/")
+    monkeypatch.setattr(web, "get_http_session", lambda: session)
+    monkeypatch.setattr(web, "public_address", lambda url: None if "169.254" in url else "93.184.216.34")
+
+    assert web.fetch_page_text("https://example.com/article") == ""
+    assert session.requested == [("https://93.184.216.34/article", "example.com")]
+
+
+def test_redirect_loops_stop(monkeypatch):
+    session = _Session("/again")
+    monkeypatch.setattr(web, "get_http_session", lambda: session)
+    monkeypatch.setattr(web, "public_address", lambda url: "93.184.216.34")
+
+    assert web.fetch_page_text("https://example.com:8443/start") == ""
+    assert len(session.requested) == web.MAX_REDIRECTS + 1
+    assert session.requested[-1] == ("https://93.184.216.34:8443/again", "example.com:8443")
+
+
+class _Page(http.server.BaseHTTPRequestHandler):
+    hosts = []
+
+    def do_GET(self):
+        self.hosts.append(self.headers["Host"])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(b"<html><body><script>x()</script><p>Battery review</p></body></html>")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_page_is_fetched_from_the_checked_address(monkeypatch):
+    server = socketserver.TCPServer(("127.0.0.1", 0), _Page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        resolved = []
+
+        def rebinding_getaddrinfo(host, port, *args, **kwargs):
+            # A rebinding host answers a public address once, then an internal one
+            resolved.append(host)
+            address = "93.184.216.34" if resolved.count(host) == 1 and host != "127.0.0.1" else "127.0.0.1"
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+        monkeypatch.setattr(socket, "getaddrinfo", rebinding_getaddrinfo)
+        # Stands in for the public address the check returned, which here is the test server
+        check = web.public_address
+        monkeypatch.setattr(web, "public_address", lambda url: check(url) and "127.0.0.1")
+
+        assert web.fetch_page_text(f"http://rebind.example:{port}/review") == "Battery review"
+        assert resolved.count("rebind.example") == 1
+        assert _Page.hosts == [f"rebind.example:{port}"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_https_requests_pinned_to_an_address_verify_the_host_name():
+    import requests
+    from utils.clients import _pinned_host_adapter
+
+    request = requests.Request(
+        "GET", "https://93.184.216.34/article", headers={"Host": "example.com"}
+    ).prepare()
+    host_params, pool_kwargs = _pinned_host_adapter().build_connection_pool_key_attributes(request, True)
+    assert host_params["host"] == "93.184.216.34"
+    assert pool_kwargs["server_hostname"] == pool_kwargs["assert_hostname"] == "example.com"
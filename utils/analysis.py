@@ -12,17 +12,26 @@ Key functionalities:
     - Visualization of analysis results
 """
 
-import openai
-import os
 import json
+import re
+import hashlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import models
+from utils.coalesce import SingleFlight
+from utils.web import fetch_page_text
 
 import time
 start_time = time.time()
 
 MAX_WORKERS = 12
-# OpenAI API Key
-client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+TOP_COMMENTS = 5
+MAX_COMMENT_CHARS = 500
+MAX_POST_CHARS = 3000
+POST_SUMMARY_TTL = 7 * 86400
+MAX_POST_SUMMARIES = 2048
+
+# Post summaries shared by every query and session in the process.
+_post_summaries = SingleFlight(ttl=POST_SUMMARY_TTL, max_entries=MAX_POST_SUMMARIES)
 
 #### Part1: AI assistant in data searching
 def input_summarize(input) -> str:
@@ -38,8 +47,8 @@ def input_summarize(input) -> str:
     Returns:
         str: A minimal set of keywords separated by spaces.
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = models.create(
+        models.KEYWORD_EXTRACTION,
         messages=[
             {
                 "role": "system",
@@ -76,6 +85,35 @@ def input_summarize(input) -> str:
         return
 
 
+# Filler words dropped by `local_keywords`, following the rules of the `input_summarize` prompt
+STOP_WORDS = frozenset("""
+    a about an and any are as at be best can could do does for from good how i in is it its me my
+    most new of on or people reddit should than that the their there these think this to under vs was
+    what when where which who why will with worth you your
+""".split())
+
+
+def local_keywords(input) -> str:
+    """
+    Guesses the search keywords of a query locally, without a model call.
+
+    A cheap stand-in for `input_summarize`, used to start searching before the
+    model has answered: the query is lower-cased, stripped of punctuation and
+    of filler words.
+
+    Parameters:
+        input (str): The text typed by the user.
+
+    Returns:
+        str: The remaining words separated by spaces, or the cleaned query if
+            every word is a filler word.
+    """
+    words = re.findall(r"[\w$][\w$'.+-]*", input.lower())
+    words = [word.strip(".'-") for word in words]
+    keywords = [word for word in words if word and word not in STOP_WORDS]
+    return " ".join(keywords or words)
+
+
 def get_subreddit(keywords) -> str:
     """
     Determines the most suitable subreddit for a given keyword or phrase.
@@ -90,8 +128,8 @@ def get_subreddit(keywords) -> str:
         >>> get_subreddit("iPhone")
         "technology"
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = models.create(
+        models.SUBREDDIT_SELECTION,
         messages=[
             {
                 "role": "system",
@@ -115,16 +153,84 @@ def get_subreddit(keywords) -> str:
         return
 
 
-def summarize_post(post_url) -> str:
+def plan_searches(topics) -> list:
     """
-    Summarizes the main topics, opinions, and emotions discussed in a Reddit post.
+    Extracts the search keywords of several topics in a single request.
+
     Parameters:
-        post_url (str): The URL of the Reddit post to be summarized.
+        topics (list[str]): The topics to compare, as typed by the user.
+
     Returns:
-        str: A summary of the main themes and opinions in the post (less than 100 words).
+        list[str]: The keywords of each topic, in the order of `topics`. Topics the
+            model leaves out fall back to `local_keywords`.
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = models.create(
+        models.KEYWORD_EXTRACTION,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert at extracting concise and relevant search keywords for several topics at once. "
+                    "For each topic, extract only the most essential and minimal keywords, "
+                    "e.g. 'iPhone' for 'How is the most new iPhone?'. "
+                    "Keep the keywords of each topic distinctive, so their searches find that topic. "
+                    "Reply only with a JSON list holding one keyword string per topic, in the given order."
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Extract minimal and essential keywords for each of the topics: {json.dumps(topics)}"
+            }
+        ]
+    )
+    try:
+        content = response.choices[0].message.content.strip()
+        keywords = json.loads(content.removeprefix("```json").removeprefix("```").removesuffix("```").strip())
+    except Exception:
+        keywords = []
+    if not isinstance(keywords, list):
+        keywords = []
+    return [
+        keywords[i].strip() if i < len(keywords) and isinstance(keywords[i], str) and keywords[i].strip()
+        else local_keywords(topic)
+        for i, topic in enumerate(topics)
+    ]
+
+
+def _submission_id(post) -> str:
+    """
+    Returns the Reddit submission id of a post, falling back to its permalink.
+    """
+    if post.get("id"):
+        return post["id"]
+    match = re.search(r"/comments/([a-z0-9]+)", post.get("post_url") or "")
+    return match.group(1) if match else post.get("post_url")
+
+
+def _top_comments(post, comments, limit=TOP_COMMENTS) -> list:
+    """
+    Picks the highest scored comments of a post, leaving out the post text itself.
+    """
+    selftext = post.get("text_content")
+    picked = sorted((c for c in comments if c[0] != selftext), key=lambda c: c[1], reverse=True)
+    return [text[:MAX_COMMENT_CHARS] for text, _ in picked[:limit]]
+
+
+def _summarize_post_content(post, top_comments) -> str:
+    """
+    Asks the model for a summary of the post content; raises if no summary comes back.
+    """
+    link_text = fetch_page_text(post.get("link_url"))
+    content = f"Title: {post.get('title') or 'unknown'}\n"
+    if post.get("text_content"):
+        content += f"Post text: {post['text_content'][:MAX_POST_CHARS]}\n"
+    if link_text:
+        content += f"Linked page ({post.get('link_url')}): {link_text}\n"
+    if top_comments:
+        content += "Top comments:\n" + "\n".join(f"- {comment}" for comment in top_comments)
+
+    response = models.create(
+        models.POST_SUMMARY,
         messages=[
             {
                 "role": "system",
@@ -137,19 +243,101 @@ def summarize_post(post_url) -> str:
             {
                 "role": "user",
                 "content": f"""
-                Given the post '{post_url}'.
+                Given the post below.
                 Please analyze it and provide: the main topics being discussed.
+
+                {content}
                 """
             }
         ]
     )
+    summary = response.choices[0].message.content.strip()
+    if not summary:
+        raise ValueError("empty post summary")
+    return summary
+
+
+def _stored_post_summary(key, post, top_comments) -> str:
+    """
+    Returns the summary of a post from the store shared by the workers, writing it first if needed.
+    """
+    from utils import jobs
+
     try:
-        return response.choices[0].message.content.strip()
+        summary = jobs.get_post_summary(key, ttl=POST_SUMMARY_TTL)
+    except Exception as e:
+        print(f"Error reading post summary store: {e}")
+        summary = None
+    if summary is None:
+        summary = _summarize_post_content(post, top_comments)
+        try:
+            jobs.save_post_summary(key, summary)
+        except Exception as e:
+            print(f"Error writing post summary store: {e}")
+    return summary
+
+
+def summarize_post(post, comments=()) -> str:
+    """
+    Summarizes the main topics, opinions, and emotions discussed in a Reddit post.
+
+    The summary is built from the post title, its text, the page it links to and
+    its top comments. Summaries are keyed by submission id and a hash of the post
+    content (not of the comments, which vary with the query settings), and kept in
+    the job database, so a post is summarized once no matter how many queries,
+    sessions or worker processes touch it.
+
+    Parameters:
+        post (dict | str): The post metadata from `get_reddit_posts`, or only its URL.
+        comments (list[tuple[str, int]], optional): The (text, score) tuples fetched
+            for the post by `get_datas`.
+    Returns:
+        str: A summary of the main themes and opinions in the post (less than 100 words).
+    """
+    if isinstance(post, str):
+        post = {"post_url": post}
+    top_comments = _top_comments(post, comments)
+    content_hash = hashlib.sha1(json.dumps(
+        [post.get("title"), post.get("text_content"), post.get("link_url")]
+    ).encode("utf-8")).hexdigest()
+    key = f"{_submission_id(post)}:{content_hash}"
+    try:
+        # Concurrent requests within the process share one call, other processes the stored result
+        summary, _ = _post_summaries.do(key, _stored_post_summary, key, post, top_comments)
+        return summary
     except Exception:
         return
 
 
 #### Part2: AI analyist in people opinions and emotion
+EMOTIONS = ("joy", "sadness", "anger", "fear", "surprise", "disgust")
+
+
+def _load_json_reply(content) -> dict:
+    """
+    Decodes a JSON object replied by the model, with or without code fences and braces.
+    """
+    content = content.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    if not content.startswith("{"):
+        content = "{" + content + "}"
+    return json.loads(content)
+
+
+def _parse_emotion_scores(content) -> dict:
+    """
+    Parses the JSON reply of `analyze_sentiment`, with or without code fences and braces.
+
+    Raises:
+        ValueError | KeyError: If the reply is not JSON or misses an emotion score.
+    """
+    emotion_scores = _load_json_reply(content) if isinstance(content, str) else content
+    for emo in EMOTIONS:
+        emotion_scores[emo] = float(emotion_scores[emo])
+    emotion_scores["key words"] = list(emotion_scores.get("key words") or [])
+    emotion_scores["confidence"] = float(emotion_scores.get("confidence", 0))
+    return emotion_scores
+
+
 def analyze_sentiment(topic, text_and_score) -> dict:
     """
     Analyzes the sentiment of a given text and categorizes emotions with scores.
@@ -164,16 +352,15 @@ def analyze_sentiment(topic, text_and_score) -> dict:
     """
     text = text_and_score[0]
     socre = text_and_score[1]
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are an AI that analyzes emotions in text."},
-            {"role": "user",
-             "content":f'''
+    messages = [
+        {"role": "system", "content": "You are an AI that analyzes emotions in text."},
+        {"role": "user",
+         "content":f'''
               You're given a topic/summarize of the comments that you're going to analyse.
               Score each one of ollowing emotion types for the text:
              """joy, sadness, anger, fear, surprise, disgust.""" (total socre would be 100)
              Please attach each motion with a list of key words manifesting the emotion.
+             Also rate how confident you are in the scores, from 0 to 1.
              Please just reply in the json format:
              """
                 "joy": 5,
@@ -182,16 +369,20 @@ def analyze_sentiment(topic, text_and_score) -> dict:
                 "fear": 10,
                 "surprise": 20,
                 "disgust": 0,
-                "key words": ["word1", "word2"]
+                "key words": ["word1", "word2"],
+                "confidence": 0.9
              """
              Topic:{topic}
              Text: {text}
             ''' }
-        ]
-    )
+    ]
     try:
-        res_json = response.choices[0].message.content.strip()[7:-3]
-        emotion_scores = json.loads(res_json)
+        # Scored by the small model first, escalated when unparseable or unsure
+        emotion_scores = models.cascade(
+            models.COMMENT_SCORING, messages, _parse_emotion_scores,
+            accept=lambda scores: scores.get("confidence", 0) >= models.CASCADE_MIN_CONFIDENCE
+        )
+        emotion_scores.pop("confidence", None)
         for emo in emotion_scores.keys():
             if emo == "key words":
                 continue
@@ -228,6 +419,8 @@ def analyze_parallel(topic, texts, max_workers=MAX_WORKERS) -> dict:
         future_to_text = {executor.submit(analyze_sentiment, topic, text): text for text in texts}
         for future in as_completed(future_to_text):
             emotions = future.result()
+            if not emotions:
+                continue
             emotion_score["joy"] += int(emotions["joy"])
             emotion_score["sadness"] += int(emotions["sadness"])
             emotion_score["anger"] += int(emotions["anger"])
@@ -239,19 +432,22 @@ def analyze_parallel(topic, texts, max_workers=MAX_WORKERS) -> dict:
     return emotion_score, word_cloud
 
 
-def summarize_sentiment(texts:list[str], summarize_detailed) -> str:
+def summarize_sentiment(texts:list[str], summarize_detailed, on_text=None) -> str:
     """
     Generates a structured summary of the overall sentiment in a collection of texts.
+    The reply is streamed, so the summary can be shown while it is being written.
     Parameters:
         texts (list[str]): A list of texts containing various opinions and emotions.
         summarize_detailed (int): Level of summary detail (1-10). 
             - 1: Brief high-level summary.
             - 10: In-depth analysis with examples and structure.
+        on_text (Callable[[str], None], optional): Called with the summary written so far
+            each time a new piece arrives.
     Returns:
         str: A summary of emotional trends, including dominant sentiments, themes, and examples.
     """
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    chunks = models.stream(
+        models.FINAL_SUMMARY,
         messages=[
             {"role": "system", "content": "You are an AI that summarize the texts in terms of emotion."},
             {"role": "user",
@@ -274,10 +470,16 @@ def summarize_sentiment(texts:list[str], summarize_detailed) -> str:
             '''}
         ]
     )
-    return response.choices[0].message.content.strip()
+    summary = ""
+    for chunk in chunks:
+        summary += chunk
+        if on_text is not None:
+            # Stripped like the final summary, so the streamed text is a prefix of it
+            on_text(summary.lstrip())
+    return summary.strip()
 
 
-def analyze_data(post_list: list, summarize_detailed) -> list:
+def analyze_data(post_list: list, summarize_detailed, posts=None, progress=None, on_summary=None) -> list:
     """
     Performs a complete sentiment analysis pipeline on a set of Reddit posts.
     Parameters:
@@ -285,6 +487,11 @@ def analyze_data(post_list: list, summarize_detailed) -> list:
             - The first element is the post URL (str).
             - The remaining elements are tuples (text, score).
         summarize_detailed (int): The level of detail for sentiment summarization (1-10).
+        posts (list[dict], optional): The post metadata from `get_reddit_posts`, used
+            to summarize each post from its content rather than its URL.
+        progress (Callable[[str], None], optional): Receives a message after each post.
+        on_summary (Callable[[str], None], optional): Receives the summary written so far
+            while it is streamed.
     Returns:
         tuple[dict, dict, str]:
             - Emotion score distribution (joy, sadness, anger, fear, surprise, disgust).
@@ -300,9 +507,12 @@ def analyze_data(post_list: list, summarize_detailed) -> list:
         "disgust": 0
     }
     word_cloud = {}
-    for post in post_list:
+    post_info = {post["post_url"]: post for post in posts or []}
+    for i, post in enumerate(post_list):
+        if progress is not None:
+            progress(f"Performing sentiment analysis... ({i}/{len(post_list)} posts)")
         try:
-            topic = summarize_post(post[0])
+            topic = summarize_post(post_info.get(post[0], post[0]), post[1:])
             result, key_words = analyze_parallel(topic, post[1:])
             emotion_score["joy"] += int(result["joy"])
             emotion_score["sadness"] += int(result["sadness"])
@@ -315,4 +525,177 @@ def analyze_data(post_list: list, summarize_detailed) -> list:
         except Exception as e:
             print(e)
             continue
-    return emotion_score, word_cloud, summarize_sentiment(post_list, summarize_detailed)
+    if progress is not None:
+        progress("Writing the summary...")
+    return emotion_score, word_cloud, summarize_sentiment(post_list, summarize_detailed, on_text=on_summary)
+
+
+#### Part3: comparing several topics on the same discussions
+def _parse_topic_scores(content, topics) -> dict:
+    """
+    Parses the JSON reply of `analyze_sentiment_topics`.
+
+    Returns:
+        dict: The emotion scores per topic (None for topics the text does not discuss),
+            and the "confidence" of the reply.
+
+    Raises:
+        ValueError | KeyError: If the reply is not JSON or misses a topic or an emotion score.
+    """
+    reply = _load_json_reply(content)
+    # Topics are matched ignoring case and spacing, the model does not always keep their spelling
+    replied = {" ".join(str(topic).lower().split()): scores for topic, scores in reply["scores"].items()}
+    topic_scores = {}
+    for topic in topics:
+        scores = replied[" ".join(topic.lower().split())]
+        if scores is not None:
+            scores = _parse_emotion_scores(scores)
+            scores.pop("confidence", None)
+        topic_scores[topic] = scores
+    return {"scores": topic_scores, "confidence": float(reply.get("confidence", 0))}
+
+
+def analyze_sentiment_topics(topics, context, text_and_score) -> dict:
+    """
+    Scores the emotions of a text towards each of several topics, in a single request.
+    Parameters:
+        topics (list[str]): The topics being compared.
+        context (str): A summary of the post the text belongs to.
+        text_and_score (tuple[str, int]): A tuple containing:
+            - text (str): The text to analyze.
+            - score (int): The weight or importance of the text.
+    Returns:
+        dict | None: The weighted emotion scores and key words per topic, as returned by
+            `analyze_sentiment`, with None for the topics the text does not discuss;
+            None if the text could not be scored.
+    """
+    text, score = text_and_score
+    messages = [
+        {"role": "system", "content": "You are an AI that analyzes emotions in text towards several topics."},
+        {"role": "user",
+         "content": f'''
+             You're given the topics being compared, a summary of the post the text comes from, and the text.
+             For each topic the text talks about, score each one of the following emotion types towards it:
+             """joy, sadness, anger, fear, surprise, disgust.""" (total score would be 100 per topic)
+             and attach a list of key words manifesting the emotions.
+             Use null for the topics the text does not talk about.
+             Also rate how confident you are in the scores, from 0 to 1.
+             Please just reply in the json format, with every topic as a key of "scores":
+             """
+                "scores": {{
+                    "topic 1": {{"joy": 5, "sadness": 45, "anger": 20, "fear": 10, "surprise": 20, "disgust": 0,
+                                "key words": ["word1", "word2"]}},
+                    "topic 2": null
+                }},
+                "confidence": 0.9
+             """
+             Topics: {json.dumps(topics)}
+             Post: {context}
+             Text: {text}
+            ''' }
+    ]
+    try:
+        reply = models.cascade(
+            models.COMMENT_SCORING, messages, lambda content: _parse_topic_scores(content, topics),
+            accept=lambda reply: reply["confidence"] >= models.CASCADE_MIN_CONFIDENCE
+        )
+        topic_scores = reply["scores"]
+        for emotion_scores in topic_scores.values():
+            if emotion_scores is None:
+                continue
+            for emo in EMOTIONS:
+                emotion_scores[emo] *= score
+        return topic_scores
+    except Exception:
+        return
+
+
+def analyze_parallel_topics(topics, context, texts, max_workers=MAX_WORKERS) -> dict:
+    """
+    Runs `analyze_sentiment_topics` in parallel on a list of texts.
+    Parameters:
+        topics (list[str]): The topics being compared.
+        context (str): A summary of the post the texts belong to.
+        texts (list[tuple[str, int]]): A list of (text, score) tuples.
+        max_workers (int, optional): The number of threads to use. Defaults to MAX_WORKERS.
+    Returns:
+        dict: For each topic, a dictionary with:
+            - "emotion_score" (dict): Cumulative emotion scores.
+            - "word_cloud" (dict): Key word frequencies.
+            - "texts" (list[tuple[str, int]]): The texts that discuss the topic.
+    """
+    results = {
+        topic: {"emotion_score": dict.fromkeys(EMOTIONS, 0), "word_cloud": {}, "texts": []}
+        for topic in topics
+    }
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_text = {executor.submit(analyze_sentiment_topics, topics, context, text): text for text in texts}
+        for future in as_completed(future_to_text):
+            topic_scores = future.result()
+            if not topic_scores:
+                continue
+            for topic, emotions in topic_scores.items():
+                if emotions is None:
+                    continue
+                result = results[topic]
+                result["texts"].append(future_to_text[future])
+                for emo in EMOTIONS:
+                    result["emotion_score"][emo] += int(emotions[emo])
+                for key_word in emotions["key words"]:
+                    result["word_cloud"][key_word] = result["word_cloud"].get(key_word, 0) + 1
+    return results
+
+
+def compare_data(post_list: list, topics, summarize_detailed, posts=None, progress=None) -> dict:
+    """
+    Performs the sentiment analysis pipeline for several topics on one set of Reddit posts.
+
+    Every comment is scored once for all topics, and each topic is summarized
+    from the comments that discuss it.
+    Parameters:
+        post_list (list[list]): The posts, as in `analyze_data`.
+        topics (list[str]): The topics being compared.
+        summarize_detailed (int): The level of detail for sentiment summarization (1-10).
+        posts (list[dict], optional): The post metadata from `get_reddit_posts`.
+        progress (Callable[[str], None], optional): Receives a message after each post.
+    Returns:
+        dict: For each topic, a dictionary with:
+            - "emotion_score" (dict): Emotion score distribution.
+            - "word_cloud" (dict): Word cloud dictionary with keyword frequencies.
+            - "summarize" (str): A structured sentiment summary of the texts about the topic.
+    """
+    results = {topic: {"emotion_score": dict.fromkeys(EMOTIONS, 0), "word_cloud": {}, "texts": []} for topic in topics}
+    post_info = {post["post_url"]: post for post in posts or []}
+    for i, post in enumerate(post_list):
+        if progress is not None:
+            progress(f"Performing sentiment analysis... ({i}/{len(post_list)} posts)")
+        try:
+            context = summarize_post(post_info.get(post[0], post[0]), post[1:])
+            for topic, result in analyze_parallel_topics(topics, context, post[1:]).items():
+                for emo in EMOTIONS:
+                    results[topic]["emotion_score"][emo] += result["emotion_score"][emo]
+                for key_word, num in result["word_cloud"].items():
+                    results[topic]["word_cloud"][key_word] = results[topic]["word_cloud"].get(key_word, 0) + num
+                results[topic]["texts"].extend(result["texts"])
+        except Exception as e:
+            print(e)
+            continue
+
+    if progress is not None:
+        progress("Writing the summaries...")
+    texts = {topic: results[topic].pop("texts") for topic in topics}
+    with ThreadPoolExecutor(max_workers=len(topics)) as executor:
+        summaries = {
+            topic: executor.submit(summarize_sentiment, texts[topic], summarize_detailed)
+            for topic in topics if texts[topic]
+        }
+        for topic in topics:
+            if topic not in summaries:
+                results[topic]["summarize"] = "No comments about this topic were found."
+        for topic, future in summaries.items():
+            try:
+                results[topic]["summarize"] = future.result()
+            except Exception as e:
+                print(e)
+                results[topic]["summarize"] = ""
+    return results
@@ -0,0 +1,254 @@
+"""
+Reddit Archive Dumps as a Data Source
+=====================================
+
+This module reads discussions from local Reddit archive dumps (Pushshift-style
+NDJSON files, one submission or comment per line, usually zstd-compressed)
+instead of the live API, for backfills and reproducible analyses.
+
+Key functionalities:
+    - Streaming decompression and line-by-line parsing, so multi-GB dumps are
+      read in constant memory.
+    - A cheap text pre-filter before JSON parsing, so lines that cannot match
+      cost little more than decompression.
+    - Filtering submissions by keyword, subreddit, time window and score, and
+      comments by post and upvotes, producing the same `(posts, results)` as
+      `get_comments_parallel`.
+
+Notes:
+    - Configured from ARCHIVE_SUBMISSIONS, ARCHIVE_COMMENTS and the optional
+      ARCHIVE_AFTER / ARCHIVE_BEFORE (UTC timestamps or YYYY-MM-DD dates) and
+      ARCHIVE_MIN_SCORE (minimum score of a post, default 0).
+    - Reading .zst files needs the `zstandard` package; plain .ndjson/.jsonl
+      files are read as they are.
+"""
+
+import heapq
+import io
+import itertools
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+from utils.analysis import get_subreddit
+from utils.data_source import DataSource
+
+READ_SIZE = 1 << 20
+# Pushshift dumps are compressed with a long window
+MAX_WINDOW_SIZE = 1 << 31
+MAX_COMMENTS_PER_POST = 100
+LINK_ID = re.compile(r'"link_id"\s*:\s*"t3_([a-z0-9]+)"')
+
+
+def iter_ndjson_lines(path):
+    """
+    Yields the lines of an NDJSON file, decompressing it on the fly if it ends in .zst.
+
+    Parameters:
+        path (str): Path of the dump file.
+
+    Yields:
+        str: One line (one JSON object) at a time.
+    """
+    with open(path, "rb") as raw:
+        if path.endswith(".zst"):
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError("Reading .zst archives requires the 'zstandard' package.") from e
+            stream = zstandard.ZstdDecompressor(max_window_size=MAX_WINDOW_SIZE).stream_reader(raw, read_size=READ_SIZE)
+            binary = io.BufferedReader(stream, buffer_size=READ_SIZE)
+        else:
+            binary = raw
+        yield from io.TextIOWrapper(binary, encoding="utf-8", errors="replace")
+
+
+def _word_pattern(word):
+    """
+    Matches a word on its own, not inside a longer word ("ai" not in "said").
+    """
+    return re.compile(rf"(?<!\w){re.escape(word)}(?!\w)", re.IGNORECASE)
+
+
+def _parse_time(value):
+    """
+    Converts an ARCHIVE_AFTER / ARCHIVE_BEFORE setting into a UTC timestamp.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+
+class ArchiveSource(DataSource):
+    """
+    Reads submissions and comments from local archive dumps.
+
+    Parameters:
+        submissions_path (str): Dump of submissions (.zst, .ndjson or .jsonl).
+        comments_path (str): Dump of comments covering the same period.
+        after (float, optional): Only posts created after this UTC timestamp.
+        before (float, optional): Only posts created before this UTC timestamp.
+        min_post_score (int, optional): Minimum score of a post. Defaults to 0.
+    """
+    name = "archive"
+    label = "Reddit archive (local dumps)"
+
+    def __init__(self, submissions_path, comments_path, after=None, before=None, min_post_score=0):
+        self.submissions_path = submissions_path
+        self.comments_path = comments_path
+        self.after = after
+        self.before = before
+        self.min_post_score = min_post_score
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds the source from the ARCHIVE_* environment variables.
+        """
+        return cls(
+            os.environ["ARCHIVE_SUBMISSIONS"],
+            os.environ["ARCHIVE_COMMENTS"],
+            after=_parse_time(os.environ.get("ARCHIVE_AFTER")),
+            before=_parse_time(os.environ.get("ARCHIVE_BEFORE")),
+            min_post_score=int(os.environ.get("ARCHIVE_MIN_SCORE", 0)),
+        )
+
+    def find_posts(self, keyword, num_results, subreddit="all"):
+        """
+        Scans the submissions dump for the highest scored posts matching a keyword.
+
+        Every word of the keyword must appear as a whole word in the title or text
+        of a post, ignoring case, the way Reddit search matches words.
+
+        Parameters:
+            keyword (str): The keyword for the post search.
+            num_results (int): Number of posts to return.
+            subreddit (str, optional): Only posts of this subreddit; "all" for any.
+
+        Returns:
+            list[dict]: Post details, as returned by `get_reddit_posts`, best scored first.
+        """
+        words = [word.lower() for word in keyword.split()]
+        matchers = [_word_pattern(word) for word in words]
+        # Lines without the rarest-looking (longest) word are skipped before parsing. The
+        # raw line may hold non-ASCII text as \uXXXX escapes, so only ASCII words qualify.
+        ascii_words = [word for word in words if word.isascii()]
+        prefilter = re.compile(re.escape(max(ascii_words, key=len)), re.IGNORECASE) if ascii_words else None
+        subreddit = None if subreddit.lower() == "all" else subreddit.lower()
+        best = []
+        # Overlapping or re-crawled dumps hold some submissions twice; each is kept once
+        in_best = set()
+        order = itertools.count()
+        for line in iter_ndjson_lines(self.submissions_path):
+            if prefilter is not None and not prefilter.search(line):
+                continue
+            try:
+                post = json.loads(line)
+            except ValueError:
+                continue
+            try:
+                created = float(post.get("created_utc") or 0)
+                score = int(post.get("score") or 0)  # a string in some older dumps
+            except (TypeError, ValueError):
+                continue
+            if (self.after is not None and created < self.after) or (self.before is not None and created >= self.before):
+                continue
+            if score < self.min_post_score:
+                continue
+            if subreddit is not None and (post.get("subreddit") or "").lower() != subreddit:
+                continue
+            text = f"{post.get('title') or ''} {post.get('selftext') or ''}"
+            if not all(matcher.search(text) for matcher in matchers):
+                continue
+            if post["id"] in in_best:
+                continue
+            # The counter settles ties before the dicts would be compared
+            entry = (score, post["id"], next(order), self._post_info(post))
+            if len(best) < num_results:
+                heapq.heappush(best, entry)
+            elif entry[:2] > best[0][:2]:
+                in_best.discard(heapq.heapreplace(best, entry)[1])
+            else:
+                continue
+            in_best.add(post["id"])
+        return [entry[-1] for entry in sorted(best, key=lambda entry: entry[:2], reverse=True)]
+
+    def collect_comments(self, posts, min_upvotes):
+        """
+        Scans the comments dump for the top-level comments of the given posts.
+
+        Parameters:
+            posts (list[dict]): Posts returned by `find_posts`.
+            min_upvotes (int): Minimum upvotes required for a comment to be included.
+
+        Returns:
+            list[list]: One entry per post, shaped like the output of `get_datas`.
+        """
+        comments = {post["id"]: [] for post in posts}
+        seen = set()
+        for line in iter_ndjson_lines(self.comments_path):
+            match = LINK_ID.search(line)
+            if match is None or match.group(1) not in comments:
+                continue
+            try:
+                comment = json.loads(line)
+            except ValueError:
+                continue
+            body = comment.get("body")
+            try:
+                score = int(comment.get("score") or 0)
+            except (TypeError, ValueError):
+                continue
+            if comment.get("parent_id") != comment.get("link_id") or score <= min_upvotes:
+                continue
+            if body in (None, "[deleted]", "[removed]") or comment.get("id") in seen:
+                continue
+            if comment.get("id"):
+                seen.add(comment["id"])
+            kept = comments[match.group(1)]
+            if len(kept) < MAX_COMMENTS_PER_POST:
+                heapq.heappush(kept, (score, body))
+            elif score > kept[0][0]:
+                heapq.heapreplace(kept, (score, body))
+
+        results = []
+        for post in posts:
+            data = [post["post_url"]]
+            if post.get("text_content"):
+                data.append((post["text_content"], post["score"]))
+            data.extend((body, score) for score, body in sorted(comments[post["id"]], reverse=True))
+            results.append(data)
+        return results
+
+    def get_comments(self, keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning, prefetch=None):
+        # Dumps hold every top-level comment, so comment_depth has nothing left to expand
+        posts = {}
+        for keyword in (keyword if isinstance(keyword, (list, tuple)) else [keyword]):
+            subreddit = get_subreddit(keyword) if use_ai_partitioning else "all"
+            for post in self.find_posts(keyword, num_results, subreddit):
+                posts.setdefault(post["id"], post)
+        posts = list(posts.values())
+        # One pass over the comments dump serves the posts of every keyword
+        return posts, self.collect_comments(posts, min_upvotes)
+
+    @staticmethod
+    def _post_info(post) -> dict:
+        """
+        Converts a dumped submission into the post dictionary returned by `get_reddit_posts`.
+        """
+        permalink = post.get("permalink") or f"/r/{post.get('subreddit')}/comments/{post['id']}/"
+        selftext = post.get("selftext")
+        return {
+            "id": post["id"],
+            "title": post.get("title"),
+            "score": int(post.get("score") or 0),
+            "num_comments": int(post.get("num_comments") or 0),
+            "post_url": f"https://www.reddit.com{permalink}",
+            "link_url": post.get("url"),
+            "time": float(post.get("created_utc") or 0),
+            "text_content": selftext if selftext and selftext not in ("[deleted]", "[removed]") else None
+        }
@@ -0,0 +1,141 @@
+"""
+Shared API Clients
+==================
+
+This module owns the process-wide clients used to talk to external services.
+Nothing heavy is imported or constructed at import time: each client is built
+on first use and then shared by every Streamlit session served by the process.
+
+Key functionalities:
+    - Lazily constructing the OpenAI client with a pooled HTTP transport.
+    - Lazily constructing the PRAW Reddit client with a pooled requests session.
+    - Providing a pooled requests session for plain web page fetching, which
+      can connect to an address checked beforehand instead of resolving again.
+"""
+
+import os
+import threading
+
+# Size the connection pools for the thread pools that share them.
+POOL_CONNECTIONS = 16
+POOL_KEEPALIVE = 16
+HTTP_TIMEOUT = 60
+
+_lock = threading.Lock()
+_openai_client = None
+_reddit_client = None
+_http_session = None
+
+
+def _pinned_host_adapter(**kwargs):
+    """
+    Builds an HTTPAdapter for requests sent to an IP address in place of a host name.
+
+    The caller puts the address in the URL and the host name in the Host header;
+    HTTPS connections then use the host name for SNI and certificate checks, so a
+    host can be resolved once, checked, and connected to without resolving it again.
+    """
+    from urllib.parse import urlparse
+    from requests.adapters import HTTPAdapter
+
+    class PinnedHostAdapter(HTTPAdapter):
+        def build_connection_pool_key_attributes(self, request, verify, cert=None):
+            host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+            host = request.headers.get("Host")
+            if host and host_params["scheme"] == "https":
+                hostname = urlparse(f"//{host}").hostname
+                if hostname != host_params["host"]:
+                    pool_kwargs["server_hostname"] = hostname
+                    pool_kwargs["assert_hostname"] = hostname
+            return host_params, pool_kwargs
+
+    return PinnedHostAdapter(**kwargs)
+
+
+def _pooled_session(pin_hosts=False):
+    """
+    Builds a requests session whose connection pool can serve POOL_CONNECTIONS
+    concurrent requests per host without discarding connections.
+
+    Parameters:
+        pin_hosts (bool, optional): Accept requests pinned to an address, see
+            `_pinned_host_adapter`. Defaults to False.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    pool = {"pool_connections": POOL_CONNECTIONS, "pool_maxsize": POOL_CONNECTIONS}
+    adapter = _pinned_host_adapter(**pool) if pin_hosts else HTTPAdapter(**pool)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, creating it on first use.
+
+    Returns:
+        openai.OpenAI: A client backed by a keep-alive httpx connection pool.
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                import importlib
+                import openai
+
+                # The httpx distribution depends on the openai release (httpx or httpx2),
+                # so Limits comes from the package openai's own client class is built on
+                httpx = importlib.import_module(openai.DefaultHttpxClient.__mro__[1].__module__.partition(".")[0])
+                http_client = openai.DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=POOL_CONNECTIONS,
+                        max_keepalive_connections=POOL_KEEPALIVE,
+                    ),
+                    timeout=HTTP_TIMEOUT,
+                )
+                _openai_client = openai.OpenAI(
+                    api_key=os.environ.get("OPENAI_API_KEY"),
+                    http_client=http_client,
+                )
+    return _openai_client
+
+
+def get_reddit():
+    """
+    Returns the shared PRAW Reddit client, creating it on first use.
+
+    Returns:
+        praw.Reddit: A read-only Reddit client using a pooled requests session.
+    """
+    global _reddit_client
+    if _reddit_client is None:
+        with _lock:
+            if _reddit_client is None:
+                import praw
+
+                _reddit_client = praw.Reddit(
+                    client_id=os.environ.get("Reddit_Client_Id"),
+                    client_secret=os.environ.get("Reddit_Client_Secret"),
+                    user_agent="Emotion_Analysis",
+                    requestor_kwargs={"session": _pooled_session()},
+                )
+    return _reddit_client
+
+
+def get_http_session():
+    """
+    Returns the shared requests session for fetching ordinary web pages.
+
+    Returns:
+        requests.Session: A session with a connection pool sized for the thread pools,
+            accepting requests pinned to a checked address (see `utils.web`).
+    """
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                _http_session = _pooled_session(pin_hosts=True)
+    return _http_session
@@ -0,0 +1,103 @@
+"""
+Request Coalescing
+==================
+
+This module provides a process-wide "single-flight" helper. Streamlit serves
+every browser session from the same Python process, so module-level state is
+shared between sessions: when several sessions ask for the same computation
+at once, only the first one runs it and the others wait for its result.
+
+Key functionalities:
+    - Attaching concurrent identical calls to one running computation.
+    - Serving follow-up calls from a short-lived result cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_TTL = 300
+MAX_CACHED_RESULTS = 64
+
+
+class _Call:
+    """A computation in flight, shared by every caller with the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time and caches its result.
+
+    Parameters:
+        ttl (float, optional): Seconds a finished result is served from the cache.
+            Defaults to RESULT_TTL.
+        max_entries (int, optional): Maximum number of cached results, the oldest
+            are evicted first. Defaults to MAX_CACHED_RESULTS.
+    """
+
+    def __init__(self, ttl=RESULT_TTL, max_entries=MAX_CACHED_RESULTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = OrderedDict()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Returns the result of `fn(*args, **kwargs)` for `key`, running it only if
+        no identical call is in flight and no fresh result is cached.
+
+        Parameters:
+            key (Hashable): Identifies calls that are interchangeable.
+            fn (Callable): The computation to run.
+
+        Returns:
+            tuple[Any, bool]:
+                - The result of the computation.
+                - Whether the result was shared (taken from another caller or the cache).
+
+        Raises:
+            Exception: Whatever `fn` raised, re-raised in every waiting caller.
+                Failures are never cached.
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                expires_at, result = cached
+                if expires_at > time.monotonic():
+                    return result, True
+                del self._results[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if isinstance(call.error, Exception):
+                raise call.error
+            if call.error is not None:
+                # The leader was stopped by something other than a failure,
+                # e.g. its Streamlit session was rerun mid-computation.
+                raise RuntimeError("The shared computation was interrupted, please retry.")
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._results[key] = (time.monotonic() + self.ttl, call.result)
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            call.done.set()
+        return call.result, False
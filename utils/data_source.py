@@ -11,16 +11,20 @@ Key functionalities:
     - Fetching Reddit posts based on keywords or subreddit filters.
     - Extracting high-quality comments with a minimum upvote threshold.
     - Performing parallelized data collection for efficiency.
+    - Speculatively searching r/all while the query is still being planned,
+      keeping the work the final plan shares with the guess.
+    - Choosing between data sources: the live API or local archive dumps
+      (see `utils.archive_source`).
 """
 
 
-import praw
 import os
-import json
-import requests
+import threading
+from abc import ABC, abstractmethod
 import time
-from bs4 import BeautifulSoup
+from itertools import islice
 from utils.analysis import get_subreddit
+from utils.clients import get_reddit
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -29,15 +33,85 @@ MAX_WORKERS = 12
 SUB_COMMENTS_LIMIT = 3
 COMMENT_SCORE_LIMIT = 100
 AI_SUBREDDIT = False
+REDDIT_PAGE_SIZE = 100  # Reddit returns listings 100 items at a time
+MAX_PAGES = 3
+# Reddit search time filters and the number of days each covers
+TIME_FILTERS = (("hour", 1 / 24), ("day", 1), ("week", 7), ("month", 31), ("year", 366), ("all", None))
 
-reddit = praw.Reddit(
-    client_id=os.environ.get("Reddit_Client_Id"),
-    client_secret=os.environ.get("Reddit_Client_Secret"),
-    user_agent="Emotion_Analysis",
-)
 
+def _time_filter(days) -> str:
+    """
+    Returns the narrowest Reddit `time_filter` that still covers the last `days` days.
+    """
+    for time_filter, span in TIME_FILTERS:
+        if span is None or days <= span:
+            return time_filter
 
-def get_reddit_posts(subreddit="all", keyword=None, limit=5, days=90):
+
+def _post_info(post) -> dict:
+    """
+    Converts a PRAW submission into the post dictionary returned by `get_reddit_posts`.
+    """
+    return {
+        "id": post.id,
+        "title": post.title,
+        "score": post.score,
+        "num_comments": post.num_comments,
+        "post_url": f"https://www.reddit.com{post.permalink}",
+        "link_url": post.url,
+        "time": post.created_utc,
+        "text_content": post.selftext if post.selftext else None
+    }
+
+
+def iter_reddit_posts(subreddit="all", keyword=None, days=90, sort="hot", max_pages=MAX_PAGES):
+    '''
+    Lazily yields the posts of the last `days` days, paging through Reddit listings.
+
+    The time window is pushed down to Reddit with the narrowest `time_filter`
+    covering it, and a page is only requested when the previous one has been
+    consumed, so the caller decides how many pages are fetched by how far it
+    iterates. Iteration stops when the page budget runs out, or as soon as the
+    listing has clearly left the window: at the first older post when sorting by
+    "new", or after a whole page of older posts for the other sorts.
+
+    Parameters:
+        subreddit (str, optional): The subreddit to search within. Defaults to "all".
+        keyword (str, optional): A keyword to filter posts. If None, lists the subreddit.
+        days (int, optional): Only posts younger than this many days are yielded. Defaults to 90.
+        sort (str, optional): "hot", "new", "top", "relevance" or "comments". Defaults to "hot".
+        max_pages (int, optional): Maximum number of listing pages (of REDDIT_PAGE_SIZE
+            posts) to request. Defaults to MAX_PAGES.
+
+    Yields:
+        dict: Post details, as described in `get_reddit_posts`.
+    '''
+    subreddit_obj = get_reddit().subreddit(subreddit)
+    time_filter = _time_filter(days)
+    budget = max_pages * REDDIT_PAGE_SIZE
+
+    if keyword:
+        posts = subreddit_obj.search(keyword, sort=sort, time_filter=time_filter, limit=budget)
+    elif sort == "new":
+        posts = subreddit_obj.new(limit=budget)
+    elif sort == "top":
+        posts = subreddit_obj.top(time_filter=time_filter, limit=budget)
+    else:
+        posts = subreddit_obj.hot(limit=budget)
+
+    time_threshold = time.time() - (days * 86400)
+    outside_in_a_row = 0
+    for post in posts:
+        if post.created_utc <= time_threshold:
+            outside_in_a_row += 1
+            if sort == "new" or outside_in_a_row >= REDDIT_PAGE_SIZE:
+                return
+            continue
+        outside_in_a_row = 0
+        yield _post_info(post)
+
+
+def get_reddit_posts(subreddit="all", keyword=None, limit=5, days=90, sort="hot", windowed=True, max_pages=MAX_PAGES):
     '''
     Fetches recent Reddit posts from a specified subreddit, with optional keyword filtering.
 
@@ -46,9 +120,15 @@ def get_reddit_posts(subreddit="all", keyword=None, limit=5, days=90):
         keyword (str, optional): A keyword to filter posts. If None, fetches the top hot posts.
         limit (int, optional): The number of posts to retrieve. Defaults to 5.
         days (int, optional): Time filter to exclude posts older than this many days. Defaults to 90.
+        sort (str, optional): The listing order, see `iter_reddit_posts`. Defaults to "hot".
+        windowed (bool, optional): Page through time-filtered listings until `limit` posts
+            of the window are found (see `iter_reddit_posts`). If False, fetch exactly
+            `limit` posts and drop the old ones, which may return fewer. Defaults to True.
+        max_pages (int, optional): Page budget of the windowed mode. Defaults to MAX_PAGES.
 
     Returns:
         list[dict]: A list of dictionaries containing post details:
+            - id (str): The Reddit submission id.
             - title (str): The post title.
             - score (int): The post's Reddit score (upvotes - downvotes).
             - num_comments (int): Number of comments on the post.
@@ -57,10 +137,13 @@ def get_reddit_posts(subreddit="all", keyword=None, limit=5, days=90):
             - time (float): Post creation time (UTC timestamp).
             - text_content (str | None): Post text content (if available).
     '''
-    subreddit_obj = reddit.subreddit(subreddit)
+    if windowed:
+        return list(islice(iter_reddit_posts(subreddit, keyword, days, sort, max_pages), limit))
+
+    subreddit_obj = get_reddit().subreddit(subreddit)
     
     if keyword:
-        posts = subreddit_obj.search(keyword, sort="hot", limit=limit)
+        posts = subreddit_obj.search(keyword, sort=sort, limit=limit)
     else:
         posts = subreddit_obj.hot(limit=limit)
 
@@ -70,15 +153,7 @@ def get_reddit_posts(subreddit="all", keyword=None, limit=5, days=90):
     for post in posts:
         if post.created_utc <= time_threshold: 
             continue
-        results.append({
-            "title": post.title,
-            "score": post.score,
-            "num_comments": post.num_comments,
-            "post_url": f"https://www.reddit.com{post.permalink}",
-            "link_url": post.url,
-            "time": post.created_utc,
-            "text_content": post.selftext if post.selftext else None
-        })
+        results.append(_post_info(post))
 
     return results
 
@@ -102,7 +177,7 @@ def get_datas(post, comment_depth, min_upvotes):
     data = [post_url]
     if post.get("text_content"):
         data.append(((post["text_content"], post["score"])))
-    submission = reddit.submission(url=post_url)
+    submission = get_reddit().submission(url=post_url)
     submission.comments.replace_more(limit=comment_depth)
     for comment in submission.comments:
         if comment.body == '[deleted]':
@@ -112,31 +187,262 @@ def get_datas(post, comment_depth, min_upvotes):
     return data
 
 
-def get_comments_parallel(keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning, max_workers=MAX_WORKERS) -> dict:
+class SpeculativeFetch:
     '''
-    Fetches Reddit posts and extracts high-quality comments in parallel.
+    An r/all search and comment prefetch started on a guessed keyword, before the
+    keyword and subreddit models have answered.
+
+    The search runs in the background and the comments of each post it finds are
+    fetched as it goes. Once the real plan is known, `get_comments_parallel` takes
+    the whole result if the plan matches the guess, or takes the comments of the
+    posts both searches found and cancels the rest. The real search then runs on
+    the same thread pool, `executor`, rather than starting a second one.
 
     Parameters:
-        keyword (str): The keyword for Reddit post search.
+        keyword (str): The guessed keyword, e.g. from `local_keywords`.
         num_results (int): Number of posts to retrieve.
         comment_depth (int): Number of nested comment levels to extract.
         min_upvotes (int): Minimum upvotes required for a comment to be included.
+        max_workers (int, optional): Number of parallel threads for fetching data. Defaults to MAX_WORKERS.
+    '''
+
+    def __init__(self, keyword, num_results, comment_depth, min_upvotes, max_workers=MAX_WORKERS):
+        self.keyword = keyword
+        self.subreddit = "all"
+        self.num_results = num_results
+        self.comment_depth = comment_depth
+        self.min_upvotes = min_upvotes
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._posts = []
+        self._futures = {}  # post id -> future of get_datas
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._search = self.executor.submit(self._run_search)
+
+    def _run_search(self):
+        for post in islice(iter_reddit_posts(subreddit=self.subreddit, keyword=self.keyword), self.num_results):
+            with self._lock:
+                if self._cancelled.is_set():
+                    return
+                self._posts.append(post)
+                self._futures[post["id"]] = self.executor.submit(
+                    get_datas, post, self.comment_depth, self.min_upvotes
+                )
+
+    def matches(self, keyword, subreddit) -> bool:
+        '''
+        Tells whether a search for `keyword` in `subreddit` is the one that was guessed.
+        '''
+        return (
+            subreddit is not None and subreddit.lower() == self.subreddit
+            and keyword is not None and set(keyword.lower().split()) == set(self.keyword.lower().split())
+        )
+
+    def result(self):
+        '''
+        Waits for the speculative search and its comments.
+
+        Returns:
+            tuple[list[dict], list[list]]: See `get_comments_parallel`.
+        '''
+        try:
+            self._search.result()
+        except Exception as e:
+            print(f"Error in speculative search: {self.keyword}, Error: {e}")
+        with self._lock:
+            posts = list(self._posts)
+            future_to_post = {self._futures[post["id"]]: post for post in posts}
+        results = []
+        for future in as_completed(future_to_post):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error processing post: {future_to_post[future]['title']}, Error: {e}")
+        self.executor.shutdown(wait=False)
+        return posts, results
+
+    def take(self, post_id):
+        '''
+        Hands over the prefetch of a post's comments, if the speculative search found it.
+
+        Returns:
+            Future | None: The future of `get_datas` for the post, or None.
+        '''
+        with self._lock:
+            return self._futures.pop(post_id, None)
+
+    def cancel(self):
+        '''
+        Stops the speculative search and drops the prefetches nobody took.
+
+        Fetches already running, or submitted to `executor` by the real search, are
+        left to finish; no new work can be submitted afterwards.
+        '''
+        with self._lock:
+            self._cancelled.set()
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self.executor.shutdown(wait=False)
+
+
+def get_comments_parallel(keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning,
+                          max_workers=MAX_WORKERS, prefetch=None) -> dict:
+    '''
+    Fetches Reddit posts and extracts high-quality comments in parallel.
+
+    With several keywords, every keyword is searched and the comments of a post
+    found by more than one search are fetched once.
+
+    Parameters:
+        keyword (str | list[str]): The keyword for Reddit post search, or several keywords.
+        num_results (int): Number of posts to retrieve (per keyword).
+        comment_depth (int): Number of nested comment levels to extract.
+        min_upvotes (int): Minimum upvotes required for a comment to be included.
         use_ai_partitioning (bool): Whether to use AI-based subreddit selection.
         max_workers (int, optional): Number of parallel threads for fetching data. Defaults to MAX_WORKERS.
+        prefetch (SpeculativeFetch, optional): A speculative fetch started with the same
+            `num_results`, `comment_depth` and `min_upvotes`. Its result is used if it
+            searched for the same thing, otherwise the comments it already fetched are
+            reused and the rest of it is cancelled. Its thread pool is used instead of
+            `max_workers` new threads.
 
     Returns:
         tuple[list[dict], list[list]]:
             - A list of post metadata dictionaries.
             - A list of extracted post data (each containing post URL, text content, and selected comments).
     '''
-    subreddit = get_subreddit(keyword) if use_ai_partitioning else "all"
-    posts = get_reddit_posts(subreddit=subreddit, keyword=keyword, limit=num_results)
+    keywords = list(keyword) if isinstance(keyword, (list, tuple)) else [keyword]
+    posts = []
     results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_text = {executor.submit(get_datas, post, comment_depth, min_upvotes): post for post in posts}
+    executor = prefetch.executor if prefetch is not None else ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        if use_ai_partitioning:
+            subreddits = list(executor.map(get_subreddit, keywords))
+        else:
+            subreddits = ["all"] * len(keywords)
+        if prefetch is not None and len(keywords) == 1 and prefetch.matches(keywords[0], subreddits[0]):
+            return prefetch.result()
+
+        # Comments of the first posts are fetched while later listing pages are requested
+        future_to_text = {}
+        seen = set()
+        for keyword, subreddit in zip(keywords, subreddits):
+            for post in islice(iter_reddit_posts(subreddit=subreddit, keyword=keyword), num_results):
+                if post["id"] in seen:
+                    continue
+                seen.add(post["id"])
+                posts.append(post)
+                future = prefetch.take(post["id"]) if prefetch is not None else None
+                if future is None:
+                    future = executor.submit(get_datas, post, comment_depth, min_upvotes)
+                future_to_text[future] = post
+        if prefetch is not None:
+            # Work already submitted to the shared pool still runs
+            prefetch.cancel()
         for future in as_completed(future_to_text):
             try:
                 results.append(future.result())
             except Exception as e:
                 print(f"Error processing post: {future_to_text[future]['title']}, Error: {e}")
+    finally:
+        if prefetch is not None:
+            prefetch.cancel()
+        else:
+            executor.shutdown()
     return posts, results
+
+
+#### Pluggable data sources
+class DataSource(ABC):
+    '''
+    Interface of the places discussions can be collected from.
+
+    A data source turns a keyword search into the `(posts, results)` pair that
+    `get_comments_parallel` returns, so `analyze_data` works with any of them.
+    '''
+    name = None
+    label = None
+
+    def speculate(self, keyword, num_results, comment_depth, min_upvotes):
+        '''
+        Starts collecting on a guessed keyword while the real one is being worked out.
+
+        Parameters:
+            keyword (str): The guessed keyword.
+            num_results, comment_depth, min_upvotes: As in `get_comments`.
+
+        Returns:
+            SpeculativeFetch | None: The running speculation to pass to `get_comments`,
+                or None if the source does not speculate.
+        '''
+        return None
+
+    @abstractmethod
+    def get_comments(self, keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning, prefetch=None):
+        '''
+        Collects posts matching a keyword and their high-quality comments.
+
+        Parameters:
+            keyword (str | list[str]): The keyword for the post search, or several
+                keywords whose results are merged.
+            num_results (int): Number of posts to retrieve (per keyword).
+            comment_depth (int): Number of nested comment levels to extract.
+            min_upvotes (int): Minimum upvotes required for a comment to be included.
+            use_ai_partitioning (bool): Whether to use AI-based subreddit selection.
+            prefetch (optional): The result of `speculate`, if any.
+
+        Returns:
+            tuple[list[dict], list[list]]: See `get_comments_parallel`.
+        '''
+
+
+class RedditSource(DataSource):
+    '''
+    The live Reddit API, through PRAW.
+    '''
+    name = "reddit"
+    label = "Reddit (live)"
+
+    def speculate(self, keyword, num_results, comment_depth, min_upvotes):
+        return SpeculativeFetch(keyword, num_results, comment_depth, min_upvotes)
+
+    def get_comments(self, keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning, prefetch=None):
+        return get_comments_parallel(
+            keyword, num_results, comment_depth, min_upvotes, use_ai_partitioning, prefetch=prefetch
+        )
+
+
+def available_sources() -> list:
+    '''
+    Lists the names of the data sources configured in this environment.
+
+    The archive source is available when ARCHIVE_SUBMISSIONS and ARCHIVE_COMMENTS
+    point to dump files.
+    '''
+    sources = [RedditSource.name]
+    if os.environ.get("ARCHIVE_SUBMISSIONS") and os.environ.get("ARCHIVE_COMMENTS"):
+        sources.append("archive")
+    return sources
+
+
+def get_data_source(name="reddit") -> DataSource:
+    '''
+    Returns the data source with the given name.
+
+    Parameters:
+        name (str, optional): "reddit" or "archive". Defaults to "reddit".
+
+    Returns:
+        DataSource: The data source, configured from the environment.
+
+    Raises:
+        ValueError: If the name is unknown.
+    '''
+    if name == RedditSource.name:
+        return RedditSource()
+    if name == "archive":
+        from utils.archive_source import ArchiveSource
+
+        return ArchiveSource.from_env()
+    raise ValueError(f"Unknown data source: {name}")
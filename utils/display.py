@@ -9,12 +9,12 @@ using a polar bar chart ("rose chart") and word clouds.
 Key functionalities:
     - Displaying a 'rose chart' for emotion distribution.
     - Generating word clouds from either text or frequency dictionaries.
-"""
 
+Notes:
+    - matplotlib, numpy and wordcloud are imported inside the functions that
+      use them, so pages that only import this module stay fast to load.
+"""
 
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import cm
 
 def display_rose_chart(emotion_score: dict):
     """
@@ -35,6 +35,9 @@ def display_rose_chart(emotion_score: dict):
                 "disgust": 10
             }
     """
+    import numpy as np
+    import matplotlib
+    import matplotlib.pyplot as plt
 
     plt.style.use("seaborn-v0_8-whitegrid")   # use a cleaner style
 
@@ -52,7 +55,7 @@ def display_rose_chart(emotion_score: dict):
 
     # 1) Pick a color map. 'Blues' goes from light blue to dark blue.
     #    You can try "Reds", "Greens", "PuBuGn", etc. for different color families.
-    cmap = cm.get_cmap("Blues")  
+    cmap = matplotlib.colormaps["Blues"]
 
     # 2) Normalize each bar value to [0..1], then pick a color based on that ratio
     max_val = vals.max()
@@ -116,9 +119,61 @@ def display_rose_chart(emotion_score: dict):
     return plt
 
 
-from wordcloud import WordCloud
-from io import BytesIO
-from PIL import Image
+def display_rose_chart_comparison(emotion_scores: dict):
+    """
+    Display the emotion distributions of several topics as overlaid rose charts.
+
+    Each topic is drawn in its own color, as a share (%) of its total score, so
+    topics discussed in more comments are not drawn larger.
+
+    Parameters
+    ----------
+    emotion_scores : dict
+        A dictionary mapping each topic to its emotion scores, as taken by
+        `display_rose_chart`.
+    """
+    import numpy as np
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    plt.style.use("seaborn-v0_8-whitegrid")
+
+    labels = list(next(iter(emotion_scores.values())).keys())
+    num_vars = len(labels)
+    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False)
+    width = 2 * np.pi / num_vars
+    colors = matplotlib.colormaps["tab10"]
+
+    fig, ax = plt.subplots(subplot_kw={"polar": True}, figsize=(6, 6))
+    fig.subplots_adjust(top=0.90, bottom=0.12)
+
+    for i, (topic, emotion_score) in enumerate(emotion_scores.items()):
+        vals = np.array([emotion_score[label] for label in labels], dtype=float)
+        total = vals.sum()
+        shares = vals / total * 100 if total else np.zeros_like(vals)
+        # Light fills with solid outlines keep every topic readable where they overlap
+        color = colors(i % colors.N)
+        ax.bar(
+            angles,
+            shares,
+            width=width,
+            color=matplotlib.colors.to_rgba(color, 0.15),
+            edgecolor=color,
+            linewidth=2,
+            label=topic
+        )
+
+    ax.set_xticks(angles)
+    ax.set_xticklabels(labels, fontsize=11, fontweight="bold")
+    ax.tick_params(axis='x', pad=15)
+    ax.spines["polar"].set_visible(False)
+    ax.set_theta_offset(np.pi / 2)
+    ax.set_theta_direction(-1)
+
+    ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.08), ncol=min(len(emotion_scores), 3), fontsize=10)
+    ax.set_title("Emotion Distribution by Topic (% of each topic)", y=1.08, fontsize=14, fontweight="bold")
+
+    return plt
 
 
 def generate_wordcloud_from_text(text: str):
@@ -132,6 +187,7 @@ def generate_wordcloud_from_text(text: str):
     # Make sure we have text
     if not text:
         return None
+    from wordcloud import WordCloud
 
     # Create a WordCloud
     wc = WordCloud(
@@ -164,6 +220,8 @@ def generate_wordcloud_from_dict(freq_dict: dict):
     # Make sure we have a dictionary
     if not freq_dict:
         return None
+    from wordcloud import WordCloud
+
     # 1) Create a WordCloud instance
     wc = WordCloud(
         background_color="white",
@@ -0,0 +1,482 @@
+"""
+Analysis Job Queue
+==================
+
+This module runs analyses outside the Streamlit web process. Pages submit
+jobs to a local SQLite queue and poll it; a pool of worker processes claims
+queued jobs, runs the pipeline and writes progress and results back.
+
+Key functionalities:
+    - Submitting jobs, with identical queued, running or recently finished
+      jobs reused instead of run again (also across web processes).
+    - Polling job status, progress and results, and streaming the final
+      summary while the worker is still writing it.
+    - Worker processes with heartbeats, so jobs of a dead worker are retried.
+    - A post summary store shared by all workers, so a post is summarized
+      once whichever process meets it first.
+    - Starting a worker pool from the web process, or standalone:
+
+        python -m utils.jobs --workers 4
+
+Notes:
+    - The database path is read from JOBS_DB (default: jobs.sqlite3 next to Query.py).
+    - ANALYSIS_WORKERS (default 2) sets the pool the web process starts on first
+      use; set it to 0 when workers are run standalone.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from utils.pipeline import normalize_query, run_analysis, run_comparison
+
+DB_PATH = os.environ.get(
+    "JOBS_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "jobs.sqlite3")
+)
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", 2))
+POLL_INTERVAL = 0.5
+STREAM_INTERVAL = 0.1
+HEARTBEAT_INTERVAL = 5
+STALE_AFTER = 60
+MAX_ATTEMPTS = 2
+RESULT_TTL = 300
+JOB_RETENTION = 86400
+POST_SUMMARY_TTL = 7 * 86400
+INIT_ATTEMPTS = 10
+
+# Pipeline function run for each kind of job
+JOB_KINDS = {"analysis": run_analysis, "comparison": run_comparison}
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = []
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    partial_summary TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, created_at);
+CREATE TABLE IF NOT EXISTS post_summaries (
+    key TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _init_schema(conn):
+    """
+    Switches the database to WAL mode and creates the schema if needed.
+
+    Processes opening a new database at the same time can get "database is locked"
+    here (the journal mode switch does not wait for other connections), so the
+    setup is retried a few times before giving up.
+    """
+    for attempt in range(INIT_ATTEMPTS):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "partial_summary" not in columns:  # databases created before summaries were streamed
+                try:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN partial_summary TEXT")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column" not in str(e):  # else added meanwhile by another process
+                        raise
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == INIT_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def _connect(db_path=None):
+    """
+    Returns this thread's connection to the job database, creating the schema if needed.
+    """
+    db_path = db_path or DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    if db_path not in connections:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        _init_schema(conn)
+        connections[db_path] = conn
+    return connections[db_path]
+
+
+def _job_key(kind, params) -> str:
+    """
+    Builds the key under which interchangeable jobs are reused.
+    """
+    params = dict(params)
+    if "user_input" in params:
+        params["user_input"] = normalize_query(params["user_input"])
+    if "topics" in params:
+        params["topics"] = [normalize_query(topic) for topic in params["topics"]]
+    return json.dumps([kind, params], sort_keys=True)
+
+
+def _as_dict(row) -> dict:
+    """
+    Converts a jobs row into a dict with decoded params and result.
+    """
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+#### Part1: used by the web pages
+def submit_job(params, kind="analysis", db_path=None):
+    """
+    Queues a job, or reuses an identical job that is queued, running or finished recently.
+
+    Parameters:
+        params (dict): Keyword arguments of the pipeline function, e.g. of `run_analysis`.
+        kind (str, optional): The kind of job. Defaults to "analysis".
+        db_path (str, optional): The job database. Defaults to DB_PATH.
+
+    Returns:
+        tuple[str, bool]:
+            - The job id.
+            - Whether an existing job was reused.
+    """
+    conn = _connect(db_path)
+    key = _job_key(kind, params)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            """
+            SELECT id FROM jobs
+            WHERE key = ? AND (status IN (?, ?) OR (status = ? AND finished_at > ?))
+            ORDER BY created_at DESC LIMIT 1
+            """,
+            (key, QUEUED, RUNNING, DONE, now - RESULT_TTL),
+        ).fetchone()
+        if row is not None:
+            conn.execute("COMMIT")
+            return row["id"], True
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO jobs (id, kind, key, params, status, progress, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, key, json.dumps(params), QUEUED, "Waiting for a worker...", now),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return job_id, False
+
+
+def get_job(job_id, db_path=None):
+    """
+    Returns the current state of a job.
+
+    Parameters:
+        job_id (str): The id returned by `submit_job`.
+        db_path (str, optional): The job database. Defaults to DB_PATH.
+
+    Returns:
+        dict | None: The job with keys "id", "kind", "params", "status", "progress",
+            "partial_summary", "result", "error" and timestamps, or None if it does not exist.
+    """
+    row = _connect(db_path).execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _as_dict(row) if row is not None else None
+
+
+def wait_for_job(job_id, on_update=None, until=None, poll_interval=POLL_INTERVAL, db_path=None):
+    """
+    Polls a job until it has finished.
+
+    Parameters:
+        job_id (str): The id returned by `submit_job`.
+        on_update (Callable[[dict], None], optional): Called with the job at every poll.
+        until (Callable[[dict], bool], optional): Stops waiting early once it returns True.
+        poll_interval (float, optional): Seconds between polls. Defaults to POLL_INTERVAL.
+        db_path (str, optional): The job database. Defaults to DB_PATH.
+
+    Returns:
+        dict: The job, finished (status DONE or FAILED) unless `until` stopped the wait.
+    """
+    while True:
+        job = get_job(job_id, db_path)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        if on_update is not None:
+            on_update(job)
+        if job["status"] in (DONE, FAILED) or (until is not None and until(job)):
+            return job
+        time.sleep(poll_interval)
+
+
+def stream_summary(job_id, poll_interval=STREAM_INTERVAL, db_path=None):
+    """
+    Yields the final summary of a job piece by piece while the worker writes it,
+    e.g. for `st.write_stream`.
+
+    Parameters:
+        job_id (str): The id returned by `submit_job`.
+        poll_interval (float, optional): Seconds between polls. Defaults to STREAM_INTERVAL.
+        db_path (str, optional): The job database. Defaults to DB_PATH.
+
+    Yields:
+        str: The text added to the summary since the previous piece. If the job is
+            retried after a worker failure and writes a different summary, a note
+            is yielded and the new summary is streamed from its start.
+    """
+    sent = ""
+    while True:
+        job = get_job(job_id, db_path)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        if job["status"] == DONE:
+            text = job["result"]["summarize"]
+        else:
+            text = job["partial_summary"] or ""
+        if text.startswith(sent):
+            if len(text) > len(sent):
+                yield text[len(sent):]
+                sent = text
+        elif not sent.startswith(text):
+            # A retried attempt is writing another summary; what was sent cannot be taken back
+            yield "\n\n*The analysis was restarted, updated summary:*\n\n"
+            sent = ""
+            continue
+        if job["status"] in (DONE, FAILED):
+            return
+        time.sleep(poll_interval)
+
+
+def ensure_workers(num_workers=None, initializer=None, db_path=None):
+    """
+    Starts the worker pool of this process if it is not running, and replaces
+    workers that have died. Safe to call on every script run.
+
+    Parameters:
+        num_workers (int, optional): Pool size. Defaults to ANALYSIS_WORKERS; 0 starts
+            nothing, for deployments that run workers standalone.
+        initializer (Callable[[], None], optional): A module-level function each worker
+            runs before serving jobs, e.g. to install fake backends in load tests.
+        db_path (str, optional): The job database. Defaults to DB_PATH.
+
+    Returns:
+        list[multiprocessing.Process]: The worker processes.
+    """
+    num_workers = ANALYSIS_WORKERS if num_workers is None else num_workers
+    if num_workers > 0:
+        _connect(db_path)  # the schema is set up once here, before the workers race to open the database
+    with _pool_lock:
+        _pool[:] = [process for process in _pool if process.is_alive()]
+        context = multiprocessing.get_context("spawn")
+        while len(_pool) < num_workers:
+            process = context.Process(
+                target=run_worker, args=(db_path or DB_PATH, initializer), daemon=True,
+                name=f"analysis-worker-{len(_pool)}",
+            )
+            process.start()
+            _pool.append(process)
+        return list(_pool)
+
+
+#### Part2: used by the worker processes
+def _claim_job(db_path):
+    """
+    Marks the oldest queued job as running and returns it. Jobs left running by
+    a dead worker are requeued first, or failed after MAX_ATTEMPTS.
+    """
+    conn = _connect(db_path)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = 'Retrying after a worker failure...', partial_summary = NULL "
+            "WHERE status = ? AND heartbeat_at < ? AND attempts < ?",
+            (QUEUED, RUNNING, now - STALE_AFTER, MAX_ATTEMPTS),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = 'The worker running this job stopped.', finished_at = ? "
+            "WHERE status = ? AND heartbeat_at < ?",
+            (FAILED, now, RUNNING, now - STALE_AFTER),
+        )
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, started_at = ?, heartbeat_at = ? "
+                "WHERE id = ?",
+                (RUNNING, os.getpid(), now, now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return _as_dict(row) if row is not None else None
+
+
+def _heartbeat(job_id, db_path, stop):
+    """
+    Refreshes the heartbeat of a running job until `stop` is set.
+    """
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        _connect(db_path).execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def _set_progress(job_id, db_path, message):
+    """
+    Records the progress message of a running job.
+    """
+    _connect(db_path).execute(
+        "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?", (message, time.time(), job_id)
+    )
+
+
+def _summary_writer(job_id, db_path):
+    """
+    Returns a callback that stores the partial summary of a running job, at most
+    once every STREAM_INTERVAL seconds.
+    """
+    last_write = 0
+
+    def write(text):
+        nonlocal last_write
+        if time.monotonic() - last_write >= STREAM_INTERVAL:
+            _connect(db_path).execute("UPDATE jobs SET partial_summary = ? WHERE id = ?", (text, job_id))
+            last_write = time.monotonic()
+
+    return write
+
+
+def _run_job(job, db_path):
+    """
+    Runs a claimed job and stores its result or error.
+    """
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job["id"], db_path, stop), daemon=True)
+    heartbeat.start()
+    try:
+        result = JOB_KINDS[job["kind"]](
+            **job["params"],
+            progress=lambda message: _set_progress(job["id"], db_path, message),
+            on_summary=_summary_writer(job["id"], db_path),
+        )
+        _connect(db_path).execute(
+            "UPDATE jobs SET status = ?, progress = 'Done', result = ?, finished_at = ? WHERE id = ?",
+            (DONE, json.dumps(result), time.time(), job["id"]),
+        )
+    except Exception as e:
+        print(f"Error running job {job['id']}: {e}")
+        _connect(db_path).execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (FAILED, str(e) or type(e).__name__, time.time(), job["id"]),
+        )
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def get_post_summary(key, ttl=POST_SUMMARY_TTL, db_path=None):
+    """
+    Returns a stored post summary younger than `ttl` seconds, or None.
+    """
+    row = _connect(db_path).execute(
+        "SELECT summary FROM post_summaries WHERE key = ? AND created_at > ?", (key, time.time() - ttl)
+    ).fetchone()
+    return row["summary"] if row is not None else None
+
+
+def save_post_summary(key, summary, db_path=None):
+    """
+    Stores a post summary for every worker to reuse.
+    """
+    _connect(db_path).execute(
+        "INSERT OR REPLACE INTO post_summaries (key, summary, created_at) VALUES (?, ?, ?)",
+        (key, summary, time.time()),
+    )
+
+
+def purge_old_jobs(db_path=None, retention=JOB_RETENTION):
+    """
+    Deletes finished jobs older than `retention` seconds, and expired post summaries.
+    """
+    conn = _connect(db_path)
+    conn.execute(
+        "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, time.time() - retention)
+    )
+    conn.execute("DELETE FROM post_summaries WHERE created_at < ?", (time.time() - POST_SUMMARY_TTL,))
+
+
+def run_worker(db_path=None, initializer=None, poll_interval=POLL_INTERVAL):
+    """
+    Serves queued jobs one at a time, forever.
+
+    Parameters:
+        db_path (str, optional): The job database. Defaults to DB_PATH.
+        initializer (Callable[[], None], optional): Run once before serving jobs.
+        poll_interval (float, optional): Seconds to wait when the queue is empty.
+    """
+    global DB_PATH
+    # The process serves this database only, so what the jobs store on their own
+    # (e.g. post summaries) goes next to the jobs
+    DB_PATH = db_path = db_path or DB_PATH
+    if initializer is not None:
+        initializer()
+    last_purge = 0
+    while True:
+        if time.time() - last_purge > JOB_RETENTION / 24:
+            purge_old_jobs(db_path)
+            last_purge = time.time()
+        job = _claim_job(db_path)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        _run_job(job, db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analysis workers for the job queue.")
+    parser.add_argument("--workers", type=int, default=max(ANALYSIS_WORKERS, 1), help="number of worker processes")
+    parser.add_argument("--db", default=DB_PATH, help="path of the job database")
+    args = parser.parse_args()
+
+    workers = ensure_workers(args.workers, db_path=args.db)
+    print(f"Serving {args.db} with {len(workers)} workers")
+    try:
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            ensure_workers(args.workers, db_path=args.db)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
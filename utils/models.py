@@ -0,0 +1,253 @@
+"""
+Model Routing
+=============
+
+This module decides which OpenAI model serves each task of the analysis
+pipeline and keeps track of what every task costs, so the routing can be
+tuned from real numbers.
+
+Key functionalities:
+    - Per-task model selection, overridable with environment variables
+      (e.g. MODEL_COMMENT_SCORING=gpt-4o).
+    - A cascade mode that answers with a small model first and escalates to
+      the large model only for unparseable or low-confidence results.
+    - Streamed completions for long replies.
+    - Per-task latency, token and cost accounting; the cost of models missing
+      from PRICES is reported as unknown rather than free.
+"""
+
+import os
+import threading
+import time
+from utils.clients import get_openai_client
+
+LARGE_MODEL = "gpt-4o"
+SMALL_MODEL = "gpt-4o-mini"
+CASCADE = "cascade"
+CASCADE_MODELS = (SMALL_MODEL, LARGE_MODEL)
+CASCADE_MIN_CONFIDENCE = float(os.environ.get("CASCADE_MIN_CONFIDENCE", 0.6))
+
+# Pipeline tasks
+KEYWORD_EXTRACTION = "keyword_extraction"
+SUBREDDIT_SELECTION = "subreddit_selection"
+COMMENT_SCORING = "comment_scoring"
+POST_SUMMARY = "post_summary"
+FINAL_SUMMARY = "final_summary"
+
+DEFAULT_ROUTES = {
+    KEYWORD_EXTRACTION: LARGE_MODEL,
+    SUBREDDIT_SELECTION: LARGE_MODEL,
+    COMMENT_SCORING: CASCADE,
+    POST_SUMMARY: LARGE_MODEL,
+    FINAL_SUMMARY: LARGE_MODEL,
+}
+MODEL_ROUTES = {task: os.environ.get(f"MODEL_{task.upper()}", model) for task, model in DEFAULT_ROUTES.items()}
+
+# USD per one million (input, output) tokens
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def route(task) -> str:
+    """
+    Returns the model configured for a task, or CASCADE.
+
+    Parameters:
+        task (str): One of the task names defined in this module.
+    """
+    return MODEL_ROUTES.get(task, LARGE_MODEL)
+
+
+def _stats_for(task, model) -> dict:
+    """
+    Returns the statistics entry of (task, model); the caller holds _stats_lock.
+    """
+    return _stats.setdefault((task, model), {
+        "calls": 0,
+        "escalations": 0,
+        "latency": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cost": 0.0,
+        "unpriced_calls": 0,
+    })
+
+
+def _record(task, model, latency, usage=None):
+    """
+    Adds one call to the usage statistics of (task, model).
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    input_price, output_price = PRICES.get(model, (0, 0))
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    unpriced = model not in PRICES
+    with _stats_lock:
+        stats = _stats_for(task, model)
+        stats["calls"] += 1
+        stats["latency"] += latency
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["cost"] += cost
+        stats["unpriced_calls"] += unpriced
+
+
+def _record_escalation(task, model):
+    """
+    Counts a result of (task, model) that had to be escalated to a larger model.
+    """
+    with _stats_lock:
+        _stats_for(task, model)["escalations"] += 1
+
+
+def _resolve(task, model=None) -> str:
+    """
+    Returns `model`, or the model routed for a task (the large model for CASCADE).
+    """
+    if model is None:
+        model = route(task)
+        if model == CASCADE:
+            model = CASCADE_MODELS[-1]
+    return model
+
+
+def create(task, messages, model=None, **kwargs):
+    """
+    Sends a chat completion request for a task and records its latency and cost.
+
+    Parameters:
+        task (str): The pipeline task the request belongs to.
+        messages (list[dict]): The chat messages.
+        model (str, optional): Overrides the routed model. For tasks routed to
+            CASCADE, defaults to the large model.
+
+    Returns:
+        openai.types.chat.ChatCompletion: The API response.
+    """
+    model = _resolve(task, model)
+    start = time.perf_counter()
+    response = get_openai_client().chat.completions.create(model=model, messages=messages, **kwargs)
+    _record(task, model, time.perf_counter() - start, getattr(response, "usage", None))
+    return response
+
+
+def stream(task, messages, model=None, **kwargs):
+    """
+    Streams a chat completion for a task, yielding the reply as it is generated.
+    Latency and cost are recorded once the stream ends.
+
+    Parameters:
+        task (str): The pipeline task the request belongs to.
+        messages (list[dict]): The chat messages.
+        model (str, optional): Overrides the routed model, as in `create`.
+
+    Yields:
+        str: The next piece of the reply text.
+    """
+    model = _resolve(task, model)
+    start = time.perf_counter()
+    usage = None
+    try:
+        chunks = get_openai_client().chat.completions.create(
+            model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **kwargs
+        )
+        for chunk in chunks:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        _record(task, model, time.perf_counter() - start, usage)
+
+
+def cascade(task, messages, parse, accept=None, **kwargs):
+    """
+    Answers a request with the cheapest model that gives an acceptable result.
+
+    If the task is routed to CASCADE, the models in CASCADE_MODELS are tried in
+    order: a result that fails to parse or is rejected by `accept` escalates to
+    the next one. Otherwise the routed model is called once.
+
+    Parameters:
+        task (str): The pipeline task the request belongs to.
+        messages (list[dict]): The chat messages.
+        parse (Callable[[str], Any]): Turns the reply text into a result; raises if it cannot.
+        accept (Callable[[Any], bool], optional): Tells whether a parsed result is
+            good enough to stop escalating. Defaults to accepting any parsed result.
+
+    Returns:
+        Any: The parsed result of the last model tried.
+
+    Raises:
+        Exception: Whatever `parse` raised for the last model tried.
+    """
+    models = CASCADE_MODELS if route(task) == CASCADE else (route(task),)
+    for i, model in enumerate(models):
+        response = create(task, messages, model=model, **kwargs)
+        last = i == len(models) - 1
+        try:
+            result = parse(response.choices[0].message.content)
+        except Exception:
+            if last:
+                raise
+        else:
+            if last or accept is None or accept(result):
+                return result
+        _record_escalation(task, model)
+
+
+def usage_snapshot() -> dict:
+    """
+    Returns a copy of the raw usage statistics, to be passed to `usage_report`.
+    """
+    with _stats_lock:
+        return {key: dict(stats) for key, stats in _stats.items()}
+
+
+def usage_report(since=None) -> list:
+    """
+    Summarizes the calls made in this process, per task and model.
+
+    Parameters:
+        since (dict, optional): A `usage_snapshot` taken earlier; only the calls made
+            after it are reported. Calls made meanwhile by other sessions of the same
+            process are included too. Defaults to reporting every call.
+
+    Returns:
+        list[dict]: One row per (task, model) with the number of calls, the share of
+            calls escalated to a larger model, the average latency in seconds,
+            the token counts and the cost in USD. The cost is None when the model
+            has no entry in PRICES, so an unknown price is not mistaken for $0.
+    """
+    since = since or {}
+    rows = []
+    for key, stats in sorted(usage_snapshot().items()):
+        before = since.get(key, {})
+        stats = {name: value - before.get(name, 0) for name, value in stats.items()}
+        if not stats["calls"]:
+            continue
+        task, model = key
+        rows.append({
+            "task": task,
+            "model": model,
+            "calls": stats["calls"],
+            "escalation_rate": round(stats["escalations"] / stats["calls"], 3),
+            "avg_latency_s": round(stats["latency"] / stats["calls"], 3),
+            "prompt_tokens": stats["prompt_tokens"],
+            "completion_tokens": stats["completion_tokens"],
+            "cost_usd": None if stats["unpriced_calls"] else round(stats["cost"], 4),
+        })
+    return rows
+
+
+def reset_usage():
+    """
+    Clears the usage statistics of this process.
+    """
+    with _stats_lock:
+        _stats.clear()
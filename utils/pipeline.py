@@ -0,0 +1,150 @@
+"""
+Analysis Pipeline
+=================
+
+This module chains keyword extraction, Reddit fetching and sentiment analysis
+into a single call. The job queue (`utils.jobs`) runs it in worker processes
+and shares one run between identical requests.
+
+Key functionalities:
+    - Running the full analysis pipeline for one user query, with the Reddit
+      search started on a local guess of the keywords while the models plan
+      the real one.
+    - Comparing several topics on one shared set of discussions.
+    - Normalizing queries so that identical requests can be recognized.
+"""
+
+from utils.analysis import input_summarize, local_keywords, plan_searches, analyze_data, compare_data
+from utils.data_source import get_data_source
+from utils import models
+
+
+def normalize_query(user_input) -> str:
+    """
+    Normalizes a user query so that trivially different spellings share a key.
+
+    Parameters:
+        user_input (str): The raw text typed by the user.
+
+    Returns:
+        str: The query lower-cased with whitespace collapsed.
+    """
+    return " ".join(user_input.lower().split())
+
+
+def run_analysis(user_input, num_results, comment_depth, min_upvotes, use_ai_partitioning,
+                 summarize_detailed, source="reddit", progress=None, on_summary=None) -> dict:
+    """
+    Runs the complete pipeline: keyword extraction, Reddit fetching and sentiment analysis.
+
+    Parameters:
+        user_input (str): The topic entered by the user.
+        num_results (int): Number of posts to retrieve.
+        comment_depth (int): Number of nested comment levels to extract.
+        min_upvotes (int): Minimum upvotes required for a comment to be included.
+        use_ai_partitioning (bool): Whether to use AI-based subreddit selection.
+        summarize_detailed (int): The level of detail for sentiment summarization (1-10).
+        source (str, optional): Name of the data source, see `get_data_source`. Defaults to "reddit".
+        progress (Callable[[str], None], optional): Receives a message at each stage.
+        on_summary (Callable[[str], None], optional): Receives the final summary written
+            so far while it is streamed.
+
+    Returns:
+        dict: The analysis with keys "keywords", "reddit_raw_data", "comments_data",
+            "emotion_score", "word_cloud", "summarize" and "usage" (the model usage
+            report of the run, see `models.usage_report`).
+    """
+    progress = progress or (lambda message: None)
+    usage_before = models.usage_snapshot()
+
+    data_source = get_data_source(source)
+    # Searching starts on a guess, so Reddit is not idle during the keyword call. The guess
+    # searches r/all, which an AI-chosen subreddit would never reuse, so it is skipped then.
+    prefetch = None
+    if not use_ai_partitioning:
+        prefetch = data_source.speculate(local_keywords(user_input), num_results, comment_depth, min_upvotes)
+    try:
+        progress("Processing keywords...")
+        keywords = input_summarize(user_input)
+
+        progress(f"Fetching relevant comments from {data_source.label}...")
+        reddit_raw_data, comments_data = data_source.get_comments(
+            keywords, num_results, comment_depth, min_upvotes, use_ai_partitioning, prefetch=prefetch
+        )
+    finally:
+        if prefetch is not None:
+            prefetch.cancel()
+
+    progress("Performing sentiment analysis...")
+    emotion_score, word_cloud, summarize = analyze_data(
+        comments_data, summarize_detailed, posts=reddit_raw_data, progress=progress,
+        on_summary=on_summary
+    )
+
+    return {
+        "keywords": keywords,
+        "reddit_raw_data": reddit_raw_data,
+        "comments_data": comments_data,
+        "emotion_score": emotion_score,
+        "word_cloud": word_cloud,
+        "summarize": summarize,
+        "usage": models.usage_report(since=usage_before),
+    }
+
+
+def run_comparison(topics, num_results, comment_depth, min_upvotes, use_ai_partitioning,
+                   summarize_detailed, source="reddit", progress=None, on_summary=None) -> dict:
+    """
+    Compares the public opinion on several topics, e.g. a brand and its competitors.
+
+    The searches of all topics are planned in one request, the union of the posts
+    they find is fetched once, and every comment is scored once for all topics.
+
+    Parameters:
+        topics (list[str]): The topics entered by the user.
+        num_results (int): Number of posts to retrieve per topic.
+        comment_depth, min_upvotes, use_ai_partitioning, summarize_detailed, source:
+            As in `run_analysis`.
+        progress (Callable[[str], None], optional): Receives a message at each stage.
+        on_summary (Callable[[str], None], optional): Receives the summaries, one
+            section per topic, once they are all written.
+
+    Returns:
+        dict: The comparison with keys "topics", "keywords" (one per topic),
+            "reddit_raw_data", "comments_data", "comparison" (per topic: "emotion_score",
+            "word_cloud" and "summarize"), "word_cloud" and "summarize" (merged over
+            the topics, for the history pages) and "usage".
+    """
+    progress = progress or (lambda message: None)
+    usage_before = models.usage_snapshot()
+
+    progress("Processing keywords...")
+    keywords = plan_searches(topics)
+
+    data_source = get_data_source(source)
+    progress(f"Fetching relevant comments from {data_source.label}...")
+    reddit_raw_data, comments_data = data_source.get_comments(
+        keywords, num_results, comment_depth, min_upvotes, use_ai_partitioning
+    )
+
+    progress("Performing sentiment analysis...")
+    comparison = compare_data(comments_data, topics, summarize_detailed, posts=reddit_raw_data, progress=progress)
+
+    word_cloud = {}
+    for result in comparison.values():
+        for key_word, num in result["word_cloud"].items():
+            word_cloud[key_word] = word_cloud.get(key_word, 0) + num
+    summarize = "\n\n".join(f"#### {topic}\n{comparison[topic]['summarize']}" for topic in topics)
+    if on_summary is not None:
+        on_summary(summarize)
+
+    return {
+        "topics": topics,
+        "keywords": keywords,
+        "reddit_raw_data": reddit_raw_data,
+        "comments_data": comments_data,
+        "comparison": comparison,
+        "word_cloud": word_cloud,
+        "summarize": summarize,
+        "usage": models.usage_report(since=usage_before),
+    }
@@ -1,4 +1,7 @@
 import streamlit as st
+from utils.jobs import get_job, DONE, FAILED
+
+PENDING_REFRESH_SECONDS = 2
 
 def load_custom_css(css_file_path: str):
     """
@@ -11,3 +14,57 @@ def load_custom_css(css_file_path: str):
     st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
 
 
+def sync_past_queries() -> list:
+    """
+    Refresh the queries of this session that are still running in the job queue,
+    copying the results of finished jobs into the session state.
+
+    Returns:
+        list[dict]: The past queries of the session, oldest first.
+    """
+    from utils.display import display_rose_chart, display_rose_chart_comparison
+
+    past_queries = st.session_state.setdefault("past_queries", [])
+    for item in past_queries:
+        if item.get("status", DONE) in (DONE, FAILED):
+            continue
+        job = get_job(item["job_id"])
+        if job is None:
+            item.update(status=FAILED, error="The job has expired.")
+            continue
+        item["status"] = job["status"]
+        item["progress"] = job["progress"]
+        if job["status"] == FAILED:
+            item["error"] = job["error"]
+        elif job["status"] == DONE:
+            result = job["result"]
+            item.update(
+                word_cloud=result["word_cloud"],
+                reddit_raw_data=result["reddit_raw_data"],
+                comments_data=result["comments_data"],
+                summarize=result["summarize"],
+            )
+            if "comparison" in result:
+                item["comparison"] = result["comparison"]
+                item["rose_chart"] = display_rose_chart_comparison(
+                    {topic: result["comparison"][topic]["emotion_score"] for topic in result["topics"]}
+                ).gcf()
+            else:
+                item["rose_chart"] = display_rose_chart(result["emotion_score"]).gcf()
+    return past_queries
+
+
+@st.fragment(run_every=PENDING_REFRESH_SECONDS)
+def show_pending_queries():
+    """
+    Show the progress of the queries still running, refreshing on its own until
+    they finish and then rerunning the page so their results appear.
+    """
+    pending = [item for item in st.session_state.get("past_queries", []) if item.get("status", DONE) not in (DONE, FAILED)]
+    if not pending:
+        return
+    sync_past_queries()
+    for item in pending:
+        st.info(f"⏳ '{item['query']}': {item.get('progress') or 'Waiting for a worker...'}")
+    if any(item["status"] in (DONE, FAILED) for item in pending):
+        st.rerun()
@@ -0,0 +1,139 @@
+"""
+Linked Page Fetching
+====================
+
+This module fetches the pages that Reddit link posts point to and reduces
+them to their readable text, so the page content can be given to the model
+instead of a bare URL.
+
+Key functionalities:
+    - Fetching pages through the shared, pooled HTTP session.
+    - Refusing links (and redirects) to loopback, private, link-local and other
+      non-public addresses, since the links are chosen by Reddit posters, and
+      connecting to the address that was checked.
+    - Extracting visible text from HTML with BeautifulSoup.
+"""
+
+import ipaddress
+import socket
+from urllib.parse import urljoin, urlparse
+from utils.clients import get_http_session
+
+FETCH_TIMEOUT = 5
+MAX_REDIRECTS = 5
+MAX_PAGE_BYTES = 2_000_000
+MAX_TEXT_CHARS = 3000
+SKIPPED_HOSTS = ("reddit.com", "redd.it", "imgur.com", "youtube.com", "youtu.be")
+SKIPPED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".gifv", ".webp", ".mp4", ".pdf")
+
+
+def is_fetchable(url) -> bool:
+    """
+    Tells whether a link points to an ordinary web page worth fetching.
+
+    Parameters:
+        url (str): The link of a Reddit post.
+
+    Returns:
+        bool: False for Reddit self links, media hosts and media files.
+    """
+    if not url:
+        return False
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if parsed.scheme not in ("http", "https"):
+        return False
+    if any(host == skipped or host.endswith("." + skipped) for skipped in SKIPPED_HOSTS):
+        return False
+    return not parsed.path.lower().endswith(SKIPPED_EXTENSIONS)
+
+
+def public_address(url):
+    """
+    Resolves the host of a link, provided every address it resolves to is a public one.
+
+    Parameters:
+        url (str): The link to check.
+
+    Returns:
+        str | None: One of the addresses, or None if the host does not resolve, or
+            resolves to a loopback, private, link-local, reserved or otherwise
+            non-global address.
+    """
+    parsed = urlparse(url)
+    if not parsed.hostname:
+        return None
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        infos = socket.getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM)
+    except (OSError, ValueError):
+        return None
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]  # "fe80::1%eth0"
+    if not addresses or not all(address.is_global for address in addresses):
+        return None
+    return str(addresses[0])
+
+
+def is_public_host(url) -> bool:
+    """
+    Tells whether every address the host of a link resolves to is a public one.
+    """
+    return public_address(url) is not None
+
+
+def _pinned_url(url, address) -> str:
+    """
+    Replaces the host of a URL with an address, keeping the port.
+    """
+    parsed = urlparse(url)
+    host = f"[{address}]" if ":" in address else address
+    if parsed.port:
+        host += f":{parsed.port}"
+    return parsed._replace(netloc=host).geturl()
+
+
+def fetch_page_text(url, max_chars=MAX_TEXT_CHARS) -> str:
+    """
+    Fetches a web page and returns its readable text.
+
+    Parameters:
+        url (str): The page to fetch.
+        max_chars (int, optional): Maximum length of the returned text. Defaults to MAX_TEXT_CHARS.
+
+    Returns:
+        str: The visible text of the page, or an empty string if the page is not
+            HTML, cannot be fetched, or is not worth fetching.
+    """
+    body = None
+    try:
+        # Redirects are followed by hand, so every hop is checked like the link itself
+        for _ in range(MAX_REDIRECTS + 1):
+            address = public_address(url) if is_fetchable(url) else None
+            if address is None:
+                return ""
+            # Connecting to the checked address, so the host cannot resolve elsewhere in between
+            with get_http_session().get(
+                _pinned_url(url, address), timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False,
+                headers={"User-Agent": "Emotion_Analysis", "Host": urlparse(url).netloc.rpartition("@")[2]}
+            ) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["Location"])
+                    continue
+                response.raise_for_status()
+                if "html" not in response.headers.get("Content-Type", ""):
+                    return ""
+                body = response.raw.read(MAX_PAGE_BYTES, decode_content=True)
+                break
+    except Exception as e:
+        print(f"Error fetching linked page: {url}, Error: {e}")
+        return ""
+    if body is None:
+        return ""
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(body, "html.parser")
+    for tag in soup(["script", "style", "noscript", "header", "footer", "nav", "aside"]):
+        tag.decompose()
+    text = " ".join(soup.get_text(separator=" ").split())
+    return text[:max_chars]